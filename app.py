@@ -1,6 +1,8 @@
 ﻿from __future__ import annotations
 
 import copy
+import hashlib
+import uuid
 from datetime import date
 from pathlib import Path
 from typing import Callable, Dict, List, Optional, Tuple
@@ -20,6 +22,7 @@ from components import (
 )
 from components.KpiCard import KpiModel
 from utils import charts, filters as filter_utils, loaders, metrics
+from utils.ausencias import AbsenceIndex, absence_index, detectar_conflictos
 
 BASE_DIR = Path(__file__).parent
 CONFIG_PATH = BASE_DIR / "config" / "config.yaml"
@@ -27,6 +30,7 @@ STYLES_PATH = BASE_DIR / "assets" / "styles.css"
 LOGO_PATH = BASE_DIR / "assets" / "logo.png"
 BASE_DATA_FILE = BASE_DIR / "data" / "base_maestra.xlsx"
 EXAMPLE_PATH = BASE_DIR / "data" / "ejemplo_base.xlsx"
+FILTER_INDEX_SLOTS = 3
 
 
 def configure_page() -> None:
@@ -67,41 +71,86 @@ def init_app_state() -> None:
     st.session_state.setdefault("column_mapping", copy.deepcopy(config.get("column_mapping", {})))
     default_source = "Base maestra" if BASE_DATA_FILE.exists() else "Archivo de ejemplo"
     st.session_state.setdefault("data_source", default_source)
-    st.session_state.setdefault("uploaded_payload", None)
+    st.session_state.setdefault("uploaded_files", [])
+    st.session_state.setdefault("ingest_report", None)
     st.session_state.setdefault("dataset", None)
     st.session_state.setdefault("events_df", None)
+    st.session_state.setdefault("events_cube", None)
+    st.session_state.setdefault("conflictos", None)
+    st.session_state.setdefault("filter_indexes", [])
     st.session_state.setdefault("filter_options", {})
     st.session_state.setdefault("dataset_signature", None)
+    st.session_state.setdefault("dataset_revision", "")
+
+
+def get_storage() -> loaders.StorageBackend:
+    return loaders.get_backend(
+        st.session_state["config"],
+        BASE_DATA_FILE,
+        st.session_state["column_mapping"],
+        root=BASE_DIR,
+    )
 
 
 def _dataset_signature(option: str) -> str:
+    """Source version plus the digest of the settings it is normalized with.
+
+    Metric and view caches are keyed on it, so editing the mapping or the
+    equivalences in Config reloads the data instead of reusing stale results.
+    """
+    digest = loaders.settings_digest(st.session_state["config"], st.session_state["column_mapping"])
+    return f"{_source_signature(option)}@{digest}"
+
+
+def _source_signature(option: str) -> str:
     if option == "Base maestra":
-        return f"base::{BASE_DATA_FILE.stat().st_mtime if BASE_DATA_FILE.exists() else 'missing'}"
+        return f"base::{get_storage().version()}"
     if option == "Archivo de ejemplo":
         return f"example::{EXAMPLE_PATH.stat().st_mtime}"
-    payload = st.session_state.get("uploaded_payload")
-    return f"upload::{hash(payload) if payload else 'empty'}"
+    if option == "Carpeta de exportaciones":
+        archivos = loaders.list_ingest_files(_ingest_dir())
+        versions = "|".join(f"{item.name}:{loaders.workbook_version(item)}" for item in archivos)
+        return f"folder::{hashlib.sha256(versions.encode('utf-8')).hexdigest()}"
+    digests = "+".join(item["digest"] for item in st.session_state.get("uploaded_files") or [])
+    return f"upload::{digests or 'empty'}"
+
+
+def _ingest_dir() -> Path:
+    carpeta = st.session_state["config"].get("ingesta", {}).get("carpeta", "data/exportaciones")
+    return BASE_DIR / carpeta
 
 
-def _load_dataset(option: str) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, List[str]]]:
-    mapping = st.session_state["column_mapping"]
-    cfg = st.session_state["config"]
-    equivalencias = cfg.get("sede_equivalencias", {})
-    reglas = cfg.get("reglas_dias", {})
+def _load_dataset(
+    option: str,
+) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, List[str]], Optional[pd.DataFrame]]:
+    settings = loaders.dataset_settings(st.session_state["config"], st.session_state["column_mapping"])
+    report = None
     if option == "Base maestra":
-        if not BASE_DATA_FILE.exists():
+        storage = get_storage()
+        if not storage.exists():
             raise ValueError("No se encontró data/base_maestra.xlsx. Usa la opción de carga manual.")
-        df = loaders.load_data(BASE_DATA_FILE, mapping, equivalencias, reglas)
+        df = storage.load_events()
     elif option == "Archivo de ejemplo":
-        df = loaders.load_data(EXAMPLE_PATH, mapping, equivalencias, reglas)
+        df = loaders.load_data(EXAMPLE_PATH, *settings)
     else:
-        payload = st.session_state.get("uploaded_payload")
-        if not payload:
-            raise ValueError("Sube un archivo para continuar.")
-        df = loaders.load_data(payload, mapping, equivalencias, reglas)
-    eventos = df[df["tipo_registro"].notna()].copy()
+        if option == "Carpeta de exportaciones":
+            archivos = loaders.list_ingest_files(_ingest_dir())
+            if not archivos:
+                raise ValueError(f"No hay archivos para cargar en {_ingest_dir()}.")
+        else:
+            archivos = [
+                Path(item["path"])
+                for item in st.session_state.get("uploaded_files") or []
+                if Path(item["path"]).exists()
+            ]
+            if not archivos:
+                raise ValueError("Sube uno o más archivos para continuar.")
+        df, report = loaders.load_many(archivos, *settings)
+        if report["error"].notna().all():
+            raise ValueError("No se pudo cargar ningún archivo: " + "; ".join(report["error"]))
+    eventos = loaders.events_view(df)
     opciones = filter_utils.list_options(eventos if not eventos.empty else df)
-    return df, eventos, opciones
+    return df, eventos, opciones, report
 
 
 def render_sidebar(active_page: str, compact: bool = False) -> None:
@@ -110,7 +159,7 @@ def render_sidebar(active_page: str, compact: bool = False) -> None:
         selector = st.container()
         selector.markdown('<div class="sidebar-shell">', unsafe_allow_html=True)
         selector.markdown("<p class='eyebrow'>Datos</p><h4>Fuente activa</h4>", unsafe_allow_html=True)
-        source_options = ["Base maestra", "Archivo de ejemplo", "Subir archivo"]
+        source_options = ["Base maestra", "Archivo de ejemplo", "Carpeta de exportaciones", "Subir archivo"]
         data_option = selector.radio(
             "Fuente de datos",
             source_options,
@@ -122,11 +171,17 @@ def render_sidebar(active_page: str, compact: bool = False) -> None:
             uploaded = selector.file_uploader(
                 "Carga Excel/CSV/Parquet",
                 type=["xlsx", "xls", "csv", "parquet"],
-                accept_multiple_files=False,
+                accept_multiple_files=True,
                 key="data_upload",
             )
-            if uploaded is not None:
-                st.session_state["uploaded_payload"] = uploaded.getvalue()
+            if uploaded:
+                spooled = {item["file_id"]: item for item in st.session_state.get("uploaded_files") or []}
+                st.session_state["uploaded_files"] = [
+                    spooled.get(item.file_id) or {**loaders.spool_upload(item), "file_id": item.file_id}
+                    for item in uploaded
+                ]
+        elif data_option == "Carpeta de exportaciones":
+            selector.caption(f"Lee todos los archivos de {_ingest_dir().relative_to(BASE_DIR)}.")
         selector.caption("Configura el mapeo desde la página Configuración.")
         selector.markdown("</div>", unsafe_allow_html=True)
         if st.button("Exportar CSV", key="sidebar-export"):
@@ -135,7 +190,7 @@ def render_sidebar(active_page: str, compact: bool = False) -> None:
     signature = _dataset_signature(data_option)
     if signature != st.session_state.get("dataset_signature"):
         try:
-            df, eventos, opciones = _load_dataset(data_option)
+            df, eventos, opciones, report = _load_dataset(data_option)
         except ValueError as exc:
             st.sidebar.warning(str(exc))
             return
@@ -143,9 +198,21 @@ def render_sidebar(active_page: str, compact: bool = False) -> None:
             st.sidebar.error(str(exc))
             return
         st.session_state["dataset_signature"] = signature
+        st.session_state["dataset_revision"] = ""
         st.session_state["dataset"] = df
         st.session_state["events_df"] = eventos
         st.session_state["filter_options"] = opciones
+        st.session_state["ingest_report"] = report
+        refresh_conflicts()
+
+    report = st.session_state.get("ingest_report")
+    if report is not None and data_option in {"Carpeta de exportaciones", "Subir archivo"}:
+        with st.sidebar:
+            fallidos = int(report["error"].notna().sum())
+            if fallidos:
+                st.warning(f"{fallidos} archivo(s) no se pudieron cargar.")
+            with st.expander(f"Detalle de carga ({len(report)} archivos)", expanded=bool(fallidos)):
+                st.dataframe(report, hide_index=True, use_container_width=True)
 
     dataset = st.session_state.get("dataset")
     if dataset is not None and not dataset.empty:
@@ -194,6 +261,92 @@ def get_events_df() -> Optional[pd.DataFrame]:
     return st.session_state.get("events_df")
 
 
+def get_events_cube() -> Optional[metrics.EventCube]:
+    events = get_events_df()
+    if events is None or events.empty:
+        return None
+    cube = st.session_state.get("events_cube")
+    if cube is None or not cube.built_from(events):
+        cube = metrics.EventCube(events)
+        st.session_state["events_cube"] = cube
+    return cube
+
+
+def cube_view(filters_state: Dict) -> Optional[metrics.CubeView]:
+    """Slice of the events cube for ``filters_state`` (``None`` for person filters)."""
+    cube = get_events_cube()
+    return cube.select(filters_state) if cube is not None else None
+
+
+def get_absence_index() -> Optional[AbsenceIndex]:
+    dataset = get_dataset()
+    if dataset is None or dataset.empty:
+        return None
+    return absence_index(dataset, dataset_version())
+
+
+def get_conflicts() -> Optional[pd.DataFrame]:
+    return st.session_state.get("conflictos")
+
+
+def refresh_conflicts() -> pd.DataFrame:
+    """Re-run the overlap detector on the active dataset."""
+    conflictos = detectar_conflictos(get_dataset())
+    st.session_state["conflictos"] = conflictos
+    return conflictos
+
+
+def dataset_version() -> str:
+    return f"{st.session_state.get('dataset_signature')}#{st.session_state.get('dataset_revision', '')}"
+
+
+def mark_dataset_edited() -> None:
+    """Give in-session edits their own version so cached metrics are not reused."""
+    st.session_state["dataset_revision"] = uuid.uuid4().hex
+    st.session_state["filter_indexes"] = []
+
+
+def metric_set(
+    rows: pd.DataFrame,
+    filters_state: Dict,
+    *,
+    scope: str = "",
+    use_cube: bool = True,
+) -> metrics.MetricSet:
+    """Memoized metrics for ``rows`` (the result of ``filters_state``) on this page."""
+    return metrics.MetricSet(
+        rows,
+        dataset_version(),
+        filters_state,
+        scope=scope,
+        view=cube_view(filters_state) if use_cube else None,
+    )
+
+
+def get_filter_index(frame: pd.DataFrame) -> filter_utils.FilterIndex:
+    """Filter index of ``frame`` (the dataset or the events view), built once per version."""
+    indexes = [index for index in st.session_state.get("filter_indexes") or [] if index.alive]
+    for index in indexes:
+        if index.built_from(frame):
+            return index
+    index = filter_utils.FilterIndex(frame)
+    st.session_state["filter_indexes"] = [*indexes[-(FILTER_INDEX_SLOTS - 1) :], index]
+    return index
+
+
+def _view_version(frame: pd.DataFrame) -> Optional[str]:
+    """Key of ``frame`` in the shared filtered-view cache (``None`` disables it).
+
+    :func:`dataset_version` already carries the settings digest; the row
+    count guards against reusing positions of a frame of another length.
+    """
+    if frame is get_events_df():
+        return f"{dataset_version()}:eventos:{len(frame)}"
+    if frame is get_dataset():
+        return f"{dataset_version()}:base:{len(frame)}"
+    return None
+
+
 def get_filter_options() -> Dict[str, List[str]]:
     return st.session_state.get("filter_options", {})
 
@@ -205,18 +358,23 @@ def apply_filters_to(
     chips: Optional[List[str]] = None,
     prefix: Optional[str] = None,
 ) -> Tuple[pd.DataFrame, Dict]:
-    options = (
-        filter_utils.list_options(dataset) if dataset is not None and not dataset.empty else filter_utils.default_filters()
-    )
+    index = get_filter_index(dataset) if dataset is not None and not dataset.empty else None
+    options = index.options() if index is not None else filter_utils.default_filters()
+    counts = None
+    if index is not None and st.session_state["config"].get("filtros", {}).get("conteos_cruzados", True):
+
+        def counts(state: Dict) -> Dict[str, Dict]:
+            return index.facet_counts(state, ("sede", "tipo"))
     filters_state = render_filters_bar(
         options if isinstance(options, dict) else {},
         state_key=state_key,
         prefix=prefix or state_key,
         chips=chips,
+        counts=counts,
     )
     filtered = (
-        filter_utils.apply_filters(dataset, filters_state)
-        if dataset is not None and not dataset.empty
+        filter_utils.apply_filters(dataset, filters_state, index, _view_version(dataset))
+        if index is not None
         else pd.DataFrame(columns=dataset.columns if dataset is not None else [])
     )
     return filtered, filters_state
@@ -297,7 +455,9 @@ def _render_home_content(
         )
         return
 
-    trend = metrics.monthly_trend(filtered)
+    metricas = metric_set(filtered, filters_state, scope="eventos")
+    trend = metrics.monthly_trend(metricas)
+    resumen = metrics.kpi_summary(metricas)
 
     def _delta_for(column: str) -> tuple[Optional[str], str]:
         if trend.empty or column not in trend or len(trend[column]) < 2:
@@ -316,21 +476,21 @@ def _render_home_content(
     kpis = [
         KpiModel(
             "Registros",
-            f"{len(filtered):,}".replace(",", "."),
-            f"{filtered['dias'].sum():.1f} días otorgados",
+            f"{resumen['registros']:,}".replace(",", "."),
+            f"{resumen['dias']:.1f} días otorgados",
             delta=registros_delta,
             delta_tone=registros_tone,
         ),
         KpiModel(
             "Personas",
-            f"{filtered['rut'].nunique():,}".replace(",", "."),
+            f"{resumen['personas']:,}".replace(",", "."),
             "Únicas en el rango",
-            delta=f"{filtered['sede'].nunique()} sedes activas",
+            delta=f"{resumen['sedes']} sedes activas",
             delta_tone="neutral",
         ),
         KpiModel(
             "Días promedio",
-            f"{filtered['dias'].mean():.1f}",
+            f"{resumen['dias_promedio']:.1f}",
             "Por evento aprobado",
             delta=dias_delta,
             delta_tone=dias_tone,
@@ -343,17 +503,21 @@ def _render_home_content(
 
     with card("Tendencia de KPIs", "Últimos 12 meses") as container:
         with container:
-            st.plotly_chart(charts.line_monthly(filtered), use_container_width=True)
+            st.plotly_chart(charts.line_monthly(metricas), use_container_width=True)
 
     charts_row = st.columns(2)
     with charts_row[0]:
         with card("Distribución por sede", "Stack por tipo de registro") as container:
             with container:
-                st.plotly_chart(charts.bar_sede(filtered), use_container_width=True)
+                st.plotly_chart(charts.bar_sede(metricas), use_container_width=True)
     with charts_row[1]:
         with card("Participación por tipo") as container:
             with container:
-                st.plotly_chart(charts.donut_tipo(filtered), use_container_width=True)
+                st.plotly_chart(charts.donut_tipo(metricas), use_container_width=True)
+
+    with card("Ausencias simultáneas", "Personas fuera por día y sede") as container:
+        with container:
+            st.plotly_chart(charts.line_ocupacion(metricas), use_container_width=True)
 
     def _list_section(df: pd.DataFrame, title: str, empty_text: str, *, date_col: str | None = None):
         with card(title, classes="list-card") as container:
@@ -392,10 +556,15 @@ def _render_home_content(
     eventos["fecha_inicio"] = pd.to_datetime(eventos.get("fecha_inicio"), errors="coerce")
     eventos["fecha_termino"] = pd.to_datetime(eventos.get("fecha_termino"), errors="coerce")
 
-    permisos_proximos = eventos[
-        eventos["tipo_registro"].str.contains("permiso", case=False, na=False)
-        & (eventos["fecha_inicio"] >= today)
-        & (eventos["fecha_inicio"] <= today + pd.Timedelta(days=21))
+    permisos = eventos[eventos["tipo_registro"].str.contains("permiso", case=False, na=False)]
+    indice = get_absence_index()
+    if indice is not None:
+        tipos_permiso = [tipo for tipo in indice.tipos if "permiso" in tipo.lower()]
+        en_ventana = indice.ausentes(today, today + pd.Timedelta(days=21), tipos_permiso)
+        permisos = permisos[permisos["rut"].isin(indice.ruts(en_ventana))]
+    permisos_proximos = permisos[
+        (permisos["fecha_inicio"] >= today)
+        & (permisos["fecha_inicio"] <= today + pd.Timedelta(days=21))
     ].sort_values("fecha_inicio").head(5)
 
     licencias_largas = eventos[
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import date, datetime, timedelta
 import calendar
-from typing import Dict, List, Tuple, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import streamlit as st
 
@@ -51,12 +51,35 @@ def _quick_ranges(today: date) -> Dict[str, Tuple[date, date]]:
     }
 
 
+def _with_count(counts: Optional[Dict], value) -> str:
+    if counts is None:
+        return str(value)
+    return f"{value} ({int(counts.get(value, 0)):,})".replace(",", ".")
+
+
+def _live_state(filters_state: Dict, state_key: str, date_key: str) -> Dict:
+    """Filter state including widget values changed in the current rerun."""
+    live = dict(filters_state)
+    live["sede"] = st.session_state.get(f"{state_key}-sedes", filters_state.get("sede", []))
+    live["tipo"] = st.session_state.get(f"{state_key}-tipos", filters_state.get("tipo", []))
+    dates = st.session_state.get(date_key)
+    if not (isinstance(dates, tuple) and len(dates) == 2):
+        stored = filters_state.get("fecha_rango")
+        stored = stored if isinstance(stored, tuple) and len(stored) == 2 else (None, None)
+        fallback = _default_dates()
+        dates = (_coerce_date(stored[0]) or fallback[0], _coerce_date(stored[1]) or fallback[1])
+    live["fecha_rango"] = dates
+    return live
+
+
 def render_filters_bar(
     options: Dict[str, List[str]],
     state_key: str = "global_filters",
     prefix: str = "flt",
     chips: List[str] | None = None,
+    counts: Optional[Callable[[Dict], Dict[str, Dict]]] = None,
 ) -> Dict:
+    """Filter bar; with ``counts`` each option shows its rows under the other filters."""
     defaults = filter_utils.default_filters()
     filters_state = st.session_state.setdefault(state_key, defaults.copy())
 
@@ -90,6 +113,9 @@ def render_filters_bar(
             unsafe_allow_html=True,
         )
 
+    date_key = f"{state_key}-dates"
+    tallies = counts(_live_state(filters_state, state_key, date_key)) if counts else {}
+
     grid = st.columns(2)
     with grid[0]:
         sede_opts = chips
@@ -98,6 +124,7 @@ def render_filters_bar(
             "Sedes",
             sede_opts,
             default=current_sedes,
+            format_func=lambda value: _with_count(tallies.get("sede"), value),
             placeholder="Todas las sedes",
             key=f"{state_key}-sedes",
         )
@@ -108,6 +135,7 @@ def render_filters_bar(
             "Tipos de registro",
             tipo_opts,
             default=current_tipos,
+            format_func=lambda value: _with_count(tallies.get("tipo"), value),
             placeholder="Todos los tipos",
             key=f"{state_key}-tipos",
         )
@@ -125,7 +153,6 @@ def render_filters_bar(
     start_default = _coerce_date(start_val) or fallback_start
     end_default = _coerce_date(end_val) or fallback_end
 
-    date_key = f"{state_key}-dates"
     if date_key not in st.session_state:
         st.session_state[date_key] = (start_default, end_default)
 
@@ -21,6 +21,8 @@ DEFAULT_NAV: Sequence[NavItem] = [
     NavItem("Personas", "&#128101;", "Personas"),
     NavItem("Permisos", "&#128221;", "Permisos"),
     NavItem("Licencias", "&#128137;", "Licencias"),
+    NavItem("Disponibilidad", "&#128197;", "Disponibilidad"),
+    NavItem("Turnos", "&#9200;", "Turnos"),
     NavItem("Reportes", "&#128202;", "Reportes"),
     NavItem("Config", "&#9881;", "Config"),
 ]
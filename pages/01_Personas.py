@@ -2,17 +2,18 @@
 
 import streamlit as st
 
-from app import apply_filters_to, filter_chips, get_dataset, use_app_shell
+from app import apply_filters_to, filter_chips, get_dataset, metric_set, use_app_shell
 from components import card, render_data_table, render_empty_state, render_kpi_card
 from components.KpiCard import KpiModel
-from utils import charts
+from utils import charts, metrics
 
 
-def _personas_kpis(df):
+def _personas_kpis(metricas):
+    resumen = metrics.kpi_summary(metricas)
     return [
-        KpiModel("Personas únicas", f"{df['rut'].nunique():,}".replace(",", "."), "En el rango seleccionado"),
-        KpiModel("Sedes activas", str(df["sede"].nunique()), "Con registros recientes"),
-        KpiModel("Registros", f"{len(df):,}".replace(",", "."), f"{df['dias'].sum():.1f} días"),
+        KpiModel("Personas únicas", f"{resumen['personas']:,}".replace(",", "."), "En el rango seleccionado"),
+        KpiModel("Sedes activas", str(resumen["sedes"]), "Con registros recientes"),
+        KpiModel("Registros", f"{resumen['registros']:,}".replace(",", "."), f"{resumen['dias']:.1f} días"),
     ]
 
 
@@ -40,8 +41,10 @@ def main():
         )
         return
 
-    cols = st.columns(len(_personas_kpis(filtered)))
-    for col, model in zip(cols, _personas_kpis(filtered)):
+    metricas = metric_set(filtered, filters_state, scope="personas")
+    kpis = _personas_kpis(metricas.over_rows("personas:filas"))
+    cols = st.columns(len(kpis))
+    for col, model in zip(cols, kpis):
         with col:
             render_kpi_card(model)
 
@@ -49,11 +52,11 @@ def main():
     with chart_row[0]:
         with card("Distribución por sede", "Comparativo de registros") as container:
             with container:
-                st.plotly_chart(charts.bar_sede(filtered), use_container_width=True)
+                st.plotly_chart(charts.bar_sede(metricas), use_container_width=True)
     with chart_row[1]:
         with card("Participación por tipo") as container:
             with container:
-                st.plotly_chart(charts.donut_tipo(filtered), use_container_width=True)
+                st.plotly_chart(charts.donut_tipo(metricas), use_container_width=True)
 
     table_cols = [
         "rut",
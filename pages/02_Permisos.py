@@ -2,7 +2,7 @@
 
 import streamlit as st
 
-from app import apply_filters_to, filter_chips, get_events_df, use_app_shell
+from app import apply_filters_to, filter_chips, get_events_df, metric_set, use_app_shell
 from components import card, render_data_table, render_empty_state, render_kpi_card
 from components.KpiCard import KpiModel
 from utils import charts
@@ -43,17 +43,19 @@ def main():
         )
         return
 
-    cols = st.columns(len(_permiso_kpis(permisos)))
-    for col, model in zip(cols, _permiso_kpis(permisos)):
+    metricas = metric_set(permisos, filters_state, scope="permisos", use_cube=False)
+    kpis = _permiso_kpis(permisos)
+    cols = st.columns(len(kpis))
+    for col, model in zip(cols, kpis):
         with col:
             render_kpi_card(model)
 
     with card("Tendencia de permisos") as container:
         with container:
-            st.plotly_chart(charts.line_monthly(permisos), use_container_width=True)
+            st.plotly_chart(charts.line_monthly(metricas), use_container_width=True)
     with card("Top personas por días") as container:
         with container:
-            st.plotly_chart(charts.bar_top_personas(permisos, metric="dias"), use_container_width=True)
+            st.plotly_chart(charts.bar_top_personas(metricas, metric="dias"), use_container_width=True)
 
     table_cols = [
         "rut",
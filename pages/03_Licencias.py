@@ -2,7 +2,7 @@
 
 import streamlit as st
 
-from app import apply_filters_to, filter_chips, get_events_df, use_app_shell
+from app import apply_filters_to, filter_chips, get_events_df, metric_set, use_app_shell
 from components import card, render_data_table, render_empty_state, render_kpi_card
 from components.KpiCard import KpiModel
 from utils import charts
@@ -44,17 +44,19 @@ def main():
         )
         return
 
-    cols = st.columns(len(_licencia_kpis(licencias)))
-    for col, model in zip(cols, _licencia_kpis(licencias)):
+    metricas = metric_set(licencias, filters_state, scope="licencias", use_cube=False)
+    kpis = _licencia_kpis(licencias)
+    cols = st.columns(len(kpis))
+    for col, model in zip(cols, kpis):
         with col:
             render_kpi_card(model)
 
     with card("Tendencia de licencias") as container:
         with container:
-            st.plotly_chart(charts.line_monthly(licencias), use_container_width=True)
+            st.plotly_chart(charts.line_monthly(metricas), use_container_width=True)
     with card("Personas con más días") as container:
         with container:
-            st.plotly_chart(charts.bar_top_personas(licencias, metric="dias"), use_container_width=True)
+            st.plotly_chart(charts.bar_top_personas(metricas, metric="dias"), use_container_width=True)
 
     licencias = licencias.assign(alerta=licencias["dias"] > 15)
     table_cols = [
@@ -11,11 +11,14 @@ from app import (
     apply_filters_to,
     filter_chips,
     filters_summary_text,
+    get_conflicts,
     get_events_df,
+    metric_set,
     use_app_shell,
 )
 from components import card, render_empty_state
 from utils import charts, exports, metrics
+from utils.ausencias import conflictos_de, marcar_conflictos
 
 TIPOS_REGISTRO = [
     "Permiso",
@@ -36,6 +39,7 @@ DEFAULT_COLUMNS = [
     "fecha_termino",
     "dias",
     "estado",
+    "conflicto",
 ]
 
 
@@ -46,6 +50,25 @@ def _match_tipo(valor: str, seleccion: List[str]) -> bool:
     return any(opc.lower() in valor_norm for opc in seleccion)
 
 
+def _spooled_csv(subset: pd.DataFrame):
+    """Stream ``subset`` to a temp file and hand the download a reader for it.
+
+    The previous export of the session is closed first; the bytes are only
+    read back when the user clicks the download button.
+    """
+    previous = st.session_state.pop("reportes_csv", None)
+    if previous is not None:
+        previous.close()
+    spool = exports.export_csv(subset)
+    st.session_state["reportes_csv"] = spool
+
+    def read() -> bytes:
+        spool.seek(0)
+        return spool.read()
+
+    return read
+
+
 def main():
     topbar = use_app_shell("Reportes", "Reportes / Export Builder", active_page="Reportes", compact_sidebar=True)
     events = get_events_df()
@@ -120,7 +143,29 @@ def main():
         render_empty_state("Sin datos tras aplicar los filtros", "Amplía el rango o selecciona más opciones.")
         return
 
-    available_columns = export_df.columns.tolist()
+    metricas = metric_set(
+        export_df,
+        {
+            **filters_state,
+            "reporte": {
+                "sedes": selected_sedes,
+                "tipos": selected_tipos,
+                "rut": rut_filter,
+                "nombre": nombre_filter,
+                "fechas": (date_start, date_end),
+            },
+        },
+        scope="reporte",
+        use_cube=False,
+    )
+    conflictos = conflictos_de(get_conflicts(), export_df.index)
+    export_df["conflicto"] = marcar_conflictos(export_df, conflictos)
+    if not conflictos.empty:
+        st.caption(
+            f"{int((export_df['conflicto'] != '').sum())} registros de la selección se superponen con otra ausencia "
+            "de la misma persona (columna conflicto)."
+        )
+    available_columns = [col for col in export_df.columns if col not in metrics.TURNO_COLUMNS]
     default_columns = [col for col in DEFAULT_COLUMNS if col in available_columns]
 
     with card("Salida del archivo"):
@@ -151,15 +196,11 @@ def main():
             filters_text = filters_summary_text(filters_state)
             with st.spinner("Preparando archivo..."):
                 if formato == "CSV":
-                    data = subset.to_csv(index=False).encode("utf-8")
+                    data = _spooled_csv(subset)
                     mime = "text/csv"
                     ext = "csv"
                 elif formato == "XLSX":
-                    buffer = exports.export_excel(
-                        subset,
-                        {"totales": metrics.kpi_totals(export_df), "pivote": metrics.dias_por_sede(export_df)},
-                        metrics.resumen_turnos(export_df),
-                    )
+                    buffer = exports.export_excel(subset, metricas, conflictos)
                     data = buffer.getvalue()
                     mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     ext = "xlsx"
@@ -170,12 +211,20 @@ def main():
                             "value": f"{int(row['registros']):,}".replace(",", "."),
                             "note": f"{row['dias']:.1f} días",
                         }
-                        for row in metrics.kpi_totals(export_df).to_dict("records")
+                        for row in metrics.kpi_totals(metricas).to_dict("records")
                     ]
+                    if not conflictos.empty:
+                        kpis_payload.append(
+                            {
+                                "label": "Superposiciones",
+                                "value": str(len(conflictos)),
+                                "note": "Ausencias que se cruzan",
+                            }
+                        )
                     pdf_bytes = exports.export_pdf(
                         subset,
                         kpis_payload,
-                        [charts.line_monthly(export_df), charts.bar_sede(export_df), charts.donut_tipo(export_df)],
+                        [charts.line_monthly(metricas), charts.bar_sede(metricas), charts.donut_tipo(metricas)],
                         BASE_DIR / "templates" / "reporte.html",
                         BASE_DIR / "assets" / "logo.png",
                         filtros=filters_text,
@@ -1,12 +1,62 @@
 ﻿from __future__ import annotations
 
 import copy
+from pathlib import Path
 
+import pandas as pd
 import streamlit as st
 import yaml
 
-from app import CONFIG_PATH, use_app_shell
+from app import BASE_DATA_FILE, CONFIG_PATH, get_storage, use_app_shell
 from components import render_empty_state
+from utils import ausencias, filters as filter_utils, loaders, metrics
+
+
+def _render_schema_probe() -> None:
+    with st.expander("Detectar columnas de un archivo"):
+        archivo = st.file_uploader(
+            "Archivo a inspeccionar",
+            type=["xlsx", "xlsm", "csv", "parquet"],
+            key="schema-probe",
+            help="Solo se lee el encabezado y una muestra de filas.",
+        )
+        source = archivo if archivo is not None else (BASE_DATA_FILE if BASE_DATA_FILE.exists() else None)
+        if source is None:
+            st.caption("Sube un archivo para ver sus columnas.")
+            return
+        mapping = st.session_state["column_mapping"]
+        try:
+            probe = loaders.probe_schema(source, mapping)
+        except Exception as exc:
+            st.warning(f"No se pudo leer el encabezado: {exc}")
+            return
+        campos = {columna: campo for campo, columna in probe["suggested"].items()}
+        sample = probe["sample"]
+        nombre = getattr(source, "name", None) or Path(source).name
+        st.caption(f"{nombre} · {len(probe['columns'])} columnas · {probe['seconds'] * 1000:.0f} ms")
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "columna": probe["columns"],
+                    "tipo": [probe["dtypes"].get(col, "") for col in probe["columns"]],
+                    "campo sugerido": [campos.get(col, "") for col in probe["columns"]],
+                    "ejemplo": [next(iter(sample[col].dropna().astype(str)), "") for col in sample.columns],
+                }
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+        faltantes = [campo for campo in sorted(loaders.REQUIRED_COLUMNS) if campo not in probe["suggested"]]
+        if faltantes:
+            st.warning("Sin coincidencia para: " + ", ".join(faltantes))
+        if st.button("Aplicar sugerencias al mapeo", disabled=not probe["suggested"]):
+            st.session_state["column_mapping"] = {**mapping, **probe["suggested"]}
+            st.session_state["config"]["column_mapping"] = {
+                **st.session_state["config"].get("column_mapping", {}),
+                **probe["suggested"],
+            }
+            st.session_state["dataset_signature"] = None
+            st.rerun()
 
 
 def main():
@@ -18,6 +68,8 @@ def main():
         )
         return
 
+    _render_schema_probe()
+
     current = copy.deepcopy(st.session_state["config"])
     with st.form("config-form"):
         st.subheader("Umbrales de semáforo")
@@ -25,11 +77,21 @@ def main():
             col1, col2 = st.columns(2)
             valores["verde"] = col1.number_input(f"{nombre} · Verde", value=float(valores.get("verde", 0.0)))
             valores["amarillo"] = col2.number_input(f"{nombre} · Amarillo", value=float(valores.get("amarillo", 0.0)))
+            if nombre == "turnos_criticos":
+                st.caption("Verde/amarillo: % de horas bajo la dotación mínima. Se evalúan las horas del horario en días con turnos.")
+                col1, col2, col3 = st.columns(3)
+                valores["minimo"] = int(col1.number_input("Dotación mínima por hora", min_value=0, value=int(valores.get("minimo", 2))))
+                valores["hora_inicio"] = int(col2.number_input("Desde (hora)", min_value=0, max_value=23, value=int(valores.get("hora_inicio", 0))))
+                valores["hora_fin"] = int(col3.number_input("Hasta (hora)", min_value=1, max_value=24, value=int(valores.get("hora_fin", 24))))
 
         st.subheader("Equivalencias de sedes")
         for clave, valor in current.get("sede_equivalencias", {}).items():
             current["sede_equivalencias"][clave] = st.text_input(clave, value=valor)
 
+        st.subheader("Equivalencias de subtipos")
+        for clave, valor in current.get("subtipo_equivalencias", {}).items():
+            current["subtipo_equivalencias"][clave] = st.text_input(clave, value=valor, key=f"subtipo-{clave}")
+
         st.subheader("Mapeo de columnas")
         for campo, ref in current.get("column_mapping", {}).items():
             current["column_mapping"][campo] = st.text_input(campo, value=ref)
@@ -45,6 +107,45 @@ def main():
         st.session_state["config"] = yaml.safe_load(CONFIG_PATH.read_text(encoding="utf-8"))
         st.success("Config restablecida. Recarga la página para ver los cambios.")
 
+    storage = get_storage()
+    error = storage.compaction_error()
+    if error:
+        st.warning(
+            f"{storage.pending_changes()} cambios siguen en el diario: la última consolidación falló ({error})."
+        )
+    if isinstance(storage, loaders.SQLiteBackend):
+        with st.expander("Almacenamiento SQLite"):
+            st.caption(f"Base activa: {storage.path.name}")
+            cols = st.columns(2)
+            if cols[0].button("Importar desde Excel", use_container_width=True):
+                filas = storage.import_xlsx(
+                    BASE_DATA_FILE,
+                    *loaders.dataset_settings(st.session_state["config"], st.session_state["column_mapping"]),
+                )
+                st.success(f"{filas} registros importados.")
+            if cols[1].button("Exportar a Excel", use_container_width=True):
+                storage.export_xlsx(BASE_DATA_FILE)
+                st.success("Base maestra actualizada desde SQLite.")
+
+    with st.expander("Uso de memoria"):
+        dataset = st.session_state.get("dataset")
+        if dataset is not None:
+            st.caption("Bytes por columna del dataset activo")
+            st.dataframe(loaders.memory_report(dataset), use_container_width=True, hide_index=True)
+        st.caption("Bytes retenidos por esta sesión")
+        st.dataframe(loaders.session_footprint(st.session_state), use_container_width=True, hide_index=True)
+        st.caption("Cache de datasets del servidor")
+        st.json(
+            {
+                "datasets": loaders.load_cache_stats(),
+                "metricas": metrics.metric_cache_stats(),
+                "vistas": filter_utils.view_cache_stats(),
+                "ausencias": ausencias.index_cache_stats(),
+                "sidecar": loaders.sidecar_stats(),
+                "fechas": loaders.date_parse_stats(),
+            }
+        )
+
 
 if __name__ == "__main__":
     main()
@@ -7,9 +7,10 @@ import numpy as np
 import pandas as pd
 import streamlit as st
 
-from app import BASE_DATA_FILE, get_dataset, use_app_shell
+from app import get_dataset, get_storage, mark_dataset_edited, refresh_conflicts, use_app_shell
 from components import card, render_empty_state
-from utils import loaders
+from utils import feriados, loaders
+from utils.ausencias import conflictos_de
 
 TIPO_EVENTO = [
     "Permiso",
@@ -73,17 +74,14 @@ def _to_date(value) -> date:
     return pd.to_datetime(value).date()
 
 
+def _calendar() -> feriados.BusinessCalendar:
+    """Business calendar of the session config (holiday overrides edited in Config)."""
+    return feriados.calendar_for((st.session_state.get("config") or {}).get("feriados", {}))
+
+
 def _business_days(start: date, end: date) -> float:
-    start = _to_date(start)
-    end = _to_date(end)
-    start_np = np.datetime64(start)
-    end_np = np.datetime64(end)
-    if end_np < start_np:
-        start_np, end_np = end_np, start_np
-    count = np.busday_count(start_np, end_np)
-    if np.is_busday(end_np):
-        count += 1
-    return float(max(count, 1))
+    count = _calendar().count(_to_date(start), _to_date(end))
+    return float(max(int(count), 1))
 
 
 def _end_from_days(start: date, days: float, tipo: str) -> date:
@@ -91,13 +89,7 @@ def _end_from_days(start: date, days: float, tipo: str) -> date:
     full_days = max(int(round(days)), 1)
     if not _is_business_type(tipo):
         return start + timedelta(days=full_days - 1)
-    remaining = full_days - 1
-    current = start
-    while remaining > 0:
-        current += timedelta(days=1)
-        if current.weekday() < 5:
-            remaining -= 1
-    return current
+    return _calendar().offset(start, full_days).astype(date)
 
 
 def _days_from_range(start: date, end: date, tipo: str) -> float:
@@ -111,7 +103,28 @@ def _days_from_range(start: date, end: date, tipo: str) -> float:
 def _refresh_events():
     dataset = st.session_state.get("dataset")
     if dataset is not None:
-        st.session_state["events_df"] = dataset[dataset["tipo_registro"].notna()].copy()
+        st.session_state["events_df"] = loaders.events_view(dataset)
+        mark_dataset_edited()
+        refresh_conflicts()
+
+
+def _warn_conflicts(label) -> None:
+    propios = conflictos_de(st.session_state.get("conflictos"), [label])
+    if propios.empty:
+        return
+    otros = sorted((set(propios["registro"].astype(str)) | set(propios["conflicto_con"].astype(str))) - {str(label)})
+    st.warning(f"El registro {label} se superpone con: {', '.join(otros)}.")
+
+
+def _conflict_table(conflictos: pd.DataFrame) -> pd.DataFrame:
+    tabla = conflictos.copy()
+    for col in ["inicio", "termino", "inicio_conflicto", "termino_conflicto"]:
+        tabla[col] = pd.to_datetime(tabla[col]).dt.strftime("%d-%m-%Y")
+    return tabla.sort_values(["inicio", "nombre"], ascending=[False, True])
+
+
+def _persists_to_base() -> bool:
+    return st.session_state.get("data_source") == "Base maestra" and get_storage().exists()
 
 
 def main():
@@ -244,14 +257,16 @@ def main():
             }
             template_cols = dataset.columns.tolist()
             new_row = _build_row(template_cols, persona_info, form_payload)
-            st.session_state["dataset"] = pd.concat(
-                [dataset, pd.DataFrame([new_row])],
-                ignore_index=True,
+            storage = get_storage()
+            label = storage.next_id(dataset)
+            st.session_state["dataset"] = loaders.compact_dataset(
+                pd.concat([dataset, pd.DataFrame([new_row], index=[label])])
             )
             _refresh_events()
-            if st.session_state.get("data_source") == "Base maestra" and BASE_DATA_FILE.exists():
-                loaders.save_dataset(st.session_state["dataset"], BASE_DATA_FILE)
+            if _persists_to_base():
+                storage.insert(label, new_row)
             st.success("Registro ingresado correctamente.")
+            _warn_conflicts(label)
 
     recent = st.session_state.get("dataset", pd.DataFrame()).sort_values("fecha_inicio", ascending=False).head(5)
     if not recent.empty:
@@ -298,26 +313,58 @@ def main():
                 delete = st.form_submit_button("Eliminar registro", use_container_width=True)
 
             if update:
-                dataset.loc[selected_idx, "tipo_registro"] = tipo_edit
-                dataset.loc[selected_idx, "subtipo"] = subtipo_edit
-                dataset.loc[selected_idx, "estado"] = estado_edit
-                dataset.loc[selected_idx, "fecha_inicio"] = pd.Timestamp(start_edit)
-                dataset.loc[selected_idx, "fecha_termino"] = pd.Timestamp(end_edit)
-                dataset.loc[selected_idx, "dias"] = float(_days_from_range(start_edit, end_edit, tipo_edit))
-                dataset.loc[selected_idx, "observacion"] = observacion_edit
+                loaders.update_record(
+                    dataset,
+                    selected_idx,
+                    {
+                        "tipo_registro": tipo_edit,
+                        "subtipo": subtipo_edit,
+                        "estado": estado_edit,
+                        "fecha_inicio": pd.Timestamp(start_edit),
+                        "fecha_termino": pd.Timestamp(end_edit),
+                        "dias": float(_days_from_range(start_edit, end_edit, tipo_edit)),
+                        "observacion": observacion_edit,
+                    },
+                )
                 st.session_state["dataset"] = dataset
                 _refresh_events()
-                if st.session_state.get("data_source") == "Base maestra" and BASE_DATA_FILE.exists():
-                    loaders.save_dataset(dataset, BASE_DATA_FILE)
+                if _persists_to_base():
+                    get_storage().update(selected_idx, dataset.loc[selected_idx].to_dict())
                 st.success("Registro actualizado.")
+                _warn_conflicts(selected_idx)
             if delete:
-                dataset = dataset.drop(index=selected_idx).reset_index(drop=True)
+                dataset = dataset.drop(index=selected_idx)
                 st.session_state["dataset"] = dataset
                 _refresh_events()
-                if st.session_state.get("data_source") == "Base maestra" and BASE_DATA_FILE.exists():
-                    loaders.save_dataset(dataset, BASE_DATA_FILE)
+                if _persists_to_base():
+                    get_storage().delete(selected_idx)
                 st.success("Registro eliminado.")
 
+    conflictos = st.session_state.get("conflictos")
+    if conflictos is not None and not conflictos.empty:
+        with card(
+            f"Registros superpuestos ({len(conflictos)})",
+            description="Ausencias de una misma persona cuyas fechas se cruzan con otra ya registrada.",
+        ):
+            st.dataframe(_conflict_table(conflictos), use_container_width=True, hide_index=True)
+
+    storage = get_storage()
+    if _persists_to_base() and storage.compactable:
+        pendientes = storage.pending_changes()
+        with card("Consolidar cambios", description="Los registros se guardan en un diario y se vuelcan al Excel periódicamente."):
+            st.caption(f"{pendientes} cambios pendientes de consolidar en data/base_maestra.xlsx.")
+            error = storage.compaction_error()
+            if error:
+                st.error(f"La última consolidación falló: {error}")
+            if st.button("Consolidar ahora", disabled=pendientes == 0, use_container_width=True):
+                try:
+                    with st.spinner("Actualizando base maestra..."):
+                        storage.compact()
+                except Exception as exc:
+                    st.error(f"No se pudo consolidar la base maestra: {exc}")
+                else:
+                    st.success("Base maestra consolidada.")
+
 
 if __name__ == "__main__":
     main()
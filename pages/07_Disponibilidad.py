@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pandas as pd
+import streamlit as st
+
+from app import get_absence_index, use_app_shell
+from components import card, render_data_table, render_empty_state, render_kpi_card
+from components.KpiCard import KpiModel
+
+
+def _disponibilidad_kpis(resumen: pd.DataFrame):
+    ausentes = int((resumen["estado"] == "Ausente").sum())
+    con_ausencia = int((resumen["dias_fuera"] > 0).sum())
+    return [
+        KpiModel("Disponibles", str(len(resumen) - ausentes), "Personas el primer día"),
+        KpiModel("Ausentes", str(ausentes), "Fuera el primer día"),
+        KpiModel("Con ausencias", str(con_ausencia), "Al menos un día en el rango"),
+    ]
+
+
+def _calendario_por_sede(calendario: pd.DataFrame, sedes: pd.Series) -> pd.DataFrame:
+    """Personas ausentes por sede (filas) y día (columnas)."""
+    tabla = calendario.groupby(sedes.fillna("Sin sede").to_numpy()).sum()
+    tabla.columns = [fecha.strftime("%d-%m") for fecha in tabla.columns]
+    return tabla
+
+
+def main():
+    use_app_shell("Disponibilidad", "Personas / Disponibilidad", active_page="Disponibilidad", compact_sidebar=True)
+    indice = get_absence_index()
+    if indice is None or indice.personas.empty:
+        render_empty_state(
+            "Sin personas cargadas",
+            "Importa tu base desde la pantalla principal para habilitar esta vista.",
+        )
+        return
+
+    hoy = date.today()
+    cols = st.columns([2, 2, 3])
+    rango = cols[0].date_input("Rango", value=(hoy, hoy + timedelta(days=13)), format="DD/MM/YYYY")
+    desde, hasta = (rango[0], rango[-1]) if isinstance(rango, (list, tuple)) and rango else (hoy, hoy)
+    sede_opciones = sorted(indice.personas["sede"].dropna().astype(str).unique())
+    sedes = cols[1].multiselect("Sede", sede_opciones)
+    tipos = cols[2].multiselect("Tipos de ausencia", indice.tipos, default=indice.tipos)
+
+    resumen = indice.disponibilidad(desde, hasta, tipos)
+    calendario = indice.calendario(desde, hasta, tipos)
+    if sedes:
+        mascara = resumen["sede"].isin(sedes).to_numpy()
+        resumen, calendario = resumen[mascara], calendario[mascara]
+
+    kpis = _disponibilidad_kpis(resumen)
+    for col, model in zip(st.columns(len(kpis)), kpis):
+        with col:
+            render_kpi_card(model)
+
+    with card("Ausentes por sede y día") as container:
+        with container:
+            st.dataframe(
+                _calendario_por_sede(calendario, resumen["sede"]),
+                use_container_width=True,
+            )
+
+    if len(indice.tipos) >= 2:
+        with card("Ausencias coincidentes") as container:
+            with container:
+                pares = st.columns(2)
+                tipo_a = pares[0].selectbox("Tipo A", indice.tipos, index=0)
+                tipo_b = pares[1].selectbox("Tipo B", indice.tipos, index=1)
+                coinciden = indice.coinciden(tipo_a, tipo_b, desde, hasta)
+                ruts = set(indice.ruts(coinciden))
+                personas = resumen[resumen["rut"].isin(ruts)]
+                if personas.empty:
+                    st.caption("Nadie registra ambos tipos de ausencia en el rango.")
+                else:
+                    st.dataframe(personas[["rut", "nombre", "sede"]], use_container_width=True, hide_index=True)
+
+    render_data_table(
+        resumen.sort_values(["dias_fuera", "nombre"], ascending=[False, True]),
+        pinned_columns=["nombre", "sede"],
+        key="disponibilidad-table",
+        title="Disponibilidad por persona",
+        description=f"Días fuera entre {desde:%d-%m-%Y} y {hasta:%d-%m-%Y}; estado al primer día",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import streamlit as st
+
+from app import apply_filters_to, filter_chips, get_events_df, metric_set, use_app_shell
+from components import card, render_data_table, render_empty_state, render_kpi_card
+from components.KpiCard import KpiModel
+from utils import charts, metrics
+
+
+def _tono(pct: float, umbral) -> str:
+    if pct <= float(umbral.get("verde", 0)):
+        return "success"
+    if pct <= float(umbral.get("amarillo", 0)):
+        return "warning"
+    return "danger"
+
+
+def _cobertura_kpis(turnos, resumen, umbral):
+    horas = int(resumen["horas"].sum())
+    criticas = int(resumen["criticas"].sum())
+    pct = round(criticas * 100.0 / horas, 1) if horas else 0.0
+    return [
+        KpiModel("Turnos", str(len(turnos)), "Registros filtrados"),
+        KpiModel("Horas evaluadas", str(horas), f"Entre {umbral.get('hora_inicio', 0)} y {umbral.get('hora_fin', 24)} h"),
+        KpiModel(
+            "Horas críticas",
+            str(criticas),
+            f"Bajo {umbral.get('minimo', metrics.COBERTURA_DEFAULTS['minimo'])} personas",
+            tone=_tono(pct, umbral),
+        ),
+        KpiModel("% críticas", f"{pct:.1f}%", "Semáforo turnos_criticos", tone=_tono(pct, umbral)),
+    ]
+
+
+def main():
+    topbar = use_app_shell("Turnos", "Turnos / Cobertura", active_page="Turnos", compact_sidebar=True)
+    events = get_events_df()
+    if events is None or events.empty:
+        render_empty_state(
+            "Sin turnos registrados",
+            "Importa tu base desde la pantalla principal para habilitar esta vista.",
+        )
+        return
+
+    filtered_all, filters_state = apply_filters_to(
+        events,
+        state_key="turnos_filters",
+        chips=["Quilpué", "Villa Alemana", "Viña del Mar"],
+        prefix="turnos",
+    )
+    topbar(filter_chips(filters_state))
+    turnos = metrics.turnos_dataset(filtered_all)
+    if turnos.empty:
+        render_empty_state(
+            "No hay turnos",
+            "Ajusta los filtros o carga una base con turno_inicio y turno_fin.",
+        )
+        return
+
+    umbral = {
+        **metrics.COBERTURA_DEFAULTS,
+        **st.session_state["config"].get("umbrales", {}).get("turnos_criticos", {}),
+    }
+    metricas = metric_set(turnos, filters_state, scope="turnos", use_cube=False)
+    cobertura = metrics.cobertura_turnos(metricas)
+    critica = metrics.cobertura_critica(cobertura, umbral)
+    resumen = critica["resumen"]
+
+    kpis = _cobertura_kpis(turnos, resumen, umbral)
+    for col, model in zip(st.columns(len(kpis)), kpis):
+        with col:
+            render_kpi_card(model)
+
+    resumen_turnos = metrics.resumen_turnos(metricas)
+    with card("Turnos por persona", "Conteo mensual, horas, nocturnos y fines de semana") as container:
+        with container:
+            st.plotly_chart(charts.heatmap_turnos(metricas), use_container_width=True)
+            st.dataframe(
+                resumen_turnos["resumen"].sort_values("horas", ascending=False),
+                use_container_width=True,
+                hide_index=True,
+            )
+
+    if cobertura.empty:
+        st.info("Los turnos filtrados no tienen hora de inicio; no es posible calcular la cobertura por hora.")
+        return
+
+    with card("Cobertura por sede", "Personas en turno a la misma hora") as container:
+        with container:
+            sede = st.selectbox("Sede", list(cobertura.columns), key="turnos-sede")
+            st.plotly_chart(charts.heatmap_cobertura(cobertura, sede), use_container_width=True)
+            tabla = resumen.assign(estado=[_tono(pct, umbral) for pct in resumen["pct_criticas"]])
+            tabla["estado"] = tabla["estado"].map({"success": "Verde", "warning": "Amarillo", "danger": "Rojo"})
+            st.dataframe(tabla, use_container_width=True, hide_index=True)
+
+    render_data_table(
+        critica["detalle"].sort_values(["faltan", "hora"], ascending=[False, True]),
+        pinned_columns=["hora", "sede"],
+        key="turnos-criticos-table",
+        title="Horas bajo la dotación mínima",
+        description="Horas del horario configurado con menos personas en turno que el mínimo",
+    )
+
+
+if __name__ == "__main__":
+    main()
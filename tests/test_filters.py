@@ -0,0 +1,141 @@
+"""apply_filters must select exactly the rows of the original chained-mask filter."""
+
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import filters
+
+
+def chained_filters(df: pd.DataFrame, filtros: dict) -> pd.DataFrame:
+    """The filter as it was written before FilterIndex: one boolean mask per key."""
+    filtered = df.copy()
+    if filtered.empty:
+        return filtered
+    if filtros.get("sede"):
+        filtered = filtered[filtered["sede"].isin(filtros["sede"])]
+    if filtros.get("personas"):
+        filtered = filtered[filtered["nombre"].isin(filtros["personas"])]
+    if filtros.get("tipo"):
+        filtered = filtered[filtered["tipo_registro"].isin(filtros["tipo"])]
+    if filtros.get("subtipo"):
+        filtered = filtered[filtered["subtipo"].isin(filtros["subtipo"])]
+    if filtros.get("estado"):
+        filtered = filtered[filtered["estado"].isin(filtros["estado"])]
+    if filtros.get("anios"):
+        filtered = filtered[filtered["fecha_inicio"].dt.year.isin(set(filtros["anios"]))]
+    if filtros.get("meses"):
+        filtered = filtered[filtered["fecha_inicio"].dt.month.isin(set(filtros["meses"]))]
+    if filtros.get("fecha_rango"):
+        start, end = filtros["fecha_rango"]
+        if start:
+            filtered = filtered[filtered["fecha_inicio"] >= pd.Timestamp(start)]
+        if end:
+            filtered = filtered[filtered["fecha_inicio"] <= pd.Timestamp(end)]
+    return filtered
+
+
+@pytest.fixture(scope="module")
+def eventos() -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    n = 600
+    fechas = pd.Series(pd.Timestamp("2024-11-01") + pd.to_timedelta(rng.integers(0, 120, n), unit="D"))
+    fechas[rng.random(n) < 0.08] = pd.NaT
+    # Exact range edges, plus a row with a time of day on the end date.
+    bordes = ("2024-12-01", "2024-12-31", "2024-12-31 10:30", "2025-01-01")
+    fechas.iloc[: len(bordes)] = [pd.Timestamp(value) for value in bordes]
+    frame = pd.DataFrame(
+        {
+            "rut": rng.choice([f"{i}-K" for i in range(40)], n),
+            "nombre": rng.choice([f"Persona {i}" for i in range(40)], n),
+            "sede": rng.choice(["Quilpué", "Viña del Mar", "Valparaíso", None], n),
+            "tipo_registro": rng.choice(["Vacaciones", "Permiso", "Licencia", None], n),
+            "subtipo": rng.choice(["Administrativo", "Sin goce", None], n),
+            "estado": rng.choice(["Aprobado", "Pendiente", None], n),
+            "fecha_inicio": fechas.to_numpy(),
+            "dias": rng.integers(1, 10, n).astype(float),
+        },
+        index=pd.RangeIndex(100, 100 + n),
+    )
+    # Categorical columns keep missing values as code -1.
+    return frame.astype({col: "category" for col in ["sede", "tipo_registro", "subtipo", "estado", "nombre"]})
+
+
+def assert_same_rows(df: pd.DataFrame, filtros: dict) -> None:
+    esperado = chained_filters(df, filtros)
+    for resultado in (
+        filters.apply_filters(df, filtros),
+        filters.apply_filters(df, filtros, filters.FilterIndex(df), version=f"test:{id(df)}"),
+    ):
+        pd.testing.assert_frame_equal(resultado, esperado)
+
+
+@pytest.mark.parametrize(
+    "filtros",
+    [
+        {},
+        filters.default_filters(),
+        {"sede": ["Quilpué"]},
+        {"sede": ["Quilpué", "No existe"]},
+        {"tipo": ["Permiso", "Licencia"], "estado": ["Aprobado"]},
+        {"subtipo": ["Sin goce"], "personas": ["Persona 3", "Persona 7"]},
+        {"anios": [2025]},
+        {"anios": [2024.0]},
+        {"meses": [12]},
+        {"meses": [1.0, 2.0]},
+        {"anios": [2024, 2025.0], "meses": [12, 1.0]},
+        {"fecha_rango": (date(2024, 12, 1), date(2024, 12, 31))},
+        {"fecha_rango": (date(2024, 12, 31), date(2024, 12, 31))},
+        {"fecha_rango": (date(2025, 1, 1), None)},
+        {"fecha_rango": (None, date(2024, 12, 31))},
+        {"fecha_rango": (None, None)},
+        {"fecha_rango": (date(2025, 3, 1), date(2024, 12, 1))},
+        {"sede": ["Viña del Mar"], "anios": [2024], "fecha_rango": (date(2024, 12, 15), None)},
+    ],
+)
+def test_apply_filters_matches_chained_masks(eventos, filtros):
+    assert_same_rows(eventos, filtros)
+
+
+def test_plain_object_columns(eventos):
+    frame = eventos.astype({col: object for col in ["sede", "tipo_registro", "subtipo", "estado", "nombre"]})
+    assert_same_rows(frame, {"sede": ["Quilpué"], "tipo": ["Permiso"], "meses": [1]})
+
+
+def test_undated_rows_only_drop_out_under_date_filters(eventos):
+    undated = eventos["fecha_inicio"].isna()
+    assert undated.any()
+    assert filters.apply_filters(eventos, {"sede": ["Quilpué"]})["fecha_inicio"].isna().any()
+    for filtros in ({"anios": [2024]}, {"meses": [12]}, {"fecha_rango": (None, date(2025, 2, 1))}):
+        assert not filters.apply_filters(eventos, filtros)["fecha_inicio"].isna().any()
+
+
+def test_missing_category_is_never_selected(eventos):
+    assert (eventos["sede"].cat.codes == -1).any()
+    resultado = filters.apply_filters(eventos, {"sede": eventos["sede"].cat.categories.tolist()})
+    assert resultado["sede"].notna().all()
+    assert len(resultado) == int(eventos["sede"].notna().sum())
+
+
+def test_end_date_is_inclusive_at_midnight_only(eventos):
+    resultado = filters.apply_filters(eventos, {"fecha_rango": (date(2024, 12, 31), date(2024, 12, 31))})
+    assert resultado["fecha_inicio"].tolist() == [pd.Timestamp("2024-12-31")] * len(resultado)
+    assert 101 in resultado.index and 102 not in resultado.index
+
+
+def test_empty_frame():
+    frame = pd.DataFrame(columns=["sede", "nombre", "tipo_registro", "subtipo", "estado", "fecha_inicio"])
+    assert filters.apply_filters(frame, {"sede": ["Quilpué"]}).empty
+
+
+def test_stale_cached_positions_are_recomputed(eventos):
+    version = f"test-stale:{id(eventos)}"
+    filtros = {"sede": ["Quilpué"]}
+    filters.apply_filters(eventos, filtros, version=version)
+    corto = eventos.iloc[:50]
+    resultado = filters.apply_filters(corto, filtros, version=version)
+    pd.testing.assert_frame_equal(resultado, chained_filters(corto, filtros))
@@ -0,0 +1,216 @@
+"""Per-person absence intervals and overlap detection between absences."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .cache import BoundedCache
+
+PERSON_COLUMNS = ["rut", "nombre", "cargo", "sede"]
+ESTADOS_IGNORADOS = {"rechazado", "anulado"}
+CONFLICT_COLUMNS = [
+    "registro",
+    "rut",
+    "nombre",
+    "sede",
+    "tipo",
+    "inicio",
+    "termino",
+    "conflicto_con",
+    "tipo_conflicto",
+    "inicio_conflicto",
+    "termino_conflicto",
+    "dias_solapados",
+]
+
+
+def _day(value) -> int:
+    return int(np.datetime64(pd.Timestamp(value).date(), "D").astype(np.int64))
+
+
+class AbsenceIndex:
+    """Absence intervals per ``tipo_registro``, queried as persons x days windows.
+
+    Each tipo keeps ``persona``, ``desde`` and ``hasta`` (day numbers,
+    inclusive) of its intervals, so memory grows with the number of
+    absences and not with the span of dates they cover. Queries only build
+    the days of the requested window, from a diff array and an ``int16``
+    cumulative sum.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        codes, ruts = pd.factorize(df["rut"])
+        self.personas = (
+            df.loc[codes >= 0, PERSON_COLUMNS]
+            .drop_duplicates("rut")
+            .astype({"rut": object})
+            .set_index("rut")
+            .reindex(pd.Index(ruts, dtype=object, name="rut"))
+        )
+        intervalos = metrics.intervalos_ausencia(df)
+        persona = pd.Index(ruts).get_indexer(intervalos["rut"])
+        intervalos = intervalos[persona >= 0].assign(persona=persona[persona >= 0])
+        desde = intervalos["inicio"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+        hasta = intervalos["termino"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+        tipos = intervalos["tipo"].astype(str).to_numpy()
+        filas = intervalos["persona"].to_numpy(dtype=np.int32)
+        self.intervalos: Dict[str, Dict[str, np.ndarray]] = {}
+        for tipo in np.unique(tipos):
+            sel = tipos == tipo
+            self.intervalos[tipo] = {"persona": filas[sel], "desde": desde[sel], "hasta": hasta[sel]}
+
+    @property
+    def tipos(self) -> List[str]:
+        return sorted(self.intervalos)
+
+    def nbytes(self) -> int:
+        arrays = sum(array.nbytes for partes in self.intervalos.values() for array in partes.values())
+        return arrays + int(self.personas.memory_usage(index=True, deep=True).sum())
+
+    def _tipos(self, tipos: Optional[Iterable[str]]) -> List[str]:
+        if tipos is None:
+            return self.tipos
+        return [tipo for tipo in tipos if tipo in self.intervalos]
+
+    def _overlapping(self, tipos: Optional[Iterable[str]], first: int, last: int):
+        """``persona``, ``desde`` and ``hasta`` of intervals touching ``first``..``last``."""
+        partes = [self.intervalos[tipo] for tipo in self._tipos(tipos)]
+        if not partes:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        persona = np.concatenate([parte["persona"] for parte in partes])
+        desde = np.concatenate([parte["desde"] for parte in partes])
+        hasta = np.concatenate([parte["hasta"] for parte in partes])
+        sel = (desde <= last) & (hasta >= first)
+        return persona[sel], desde[sel], hasta[sel]
+
+    def _window(self, tipos: Optional[Iterable[str]], desde, hasta) -> np.ndarray:
+        """Unpacked ``persons x days`` booleans for ``desde``..``hasta`` (inclusive)."""
+        first, last = _day(desde), _day(hasta)
+        width = max(last - first + 1, 0)
+        persona, inicio, termino = self._overlapping(tipos, first, last)
+        diff = np.zeros((len(self.personas), width + 1), dtype=np.int16)
+        if width and len(persona):
+            np.add.at(diff, (persona, np.maximum(inicio, first) - first), 1)
+            np.add.at(diff, (persona, np.minimum(termino, last) - first + 1), -1)
+        return np.cumsum(diff[:, :-1], axis=1, dtype=np.int16) > 0
+
+    def calendario(self, desde, hasta=None, tipos: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Persons x days booleans: who is out on each day of the range."""
+        hasta = desde if hasta is None else hasta
+        fechas = pd.date_range(pd.Timestamp(desde).normalize(), pd.Timestamp(hasta).normalize(), freq="D")
+        return pd.DataFrame(self._window(tipos, desde, hasta), index=self.personas.index, columns=fechas)
+
+    def ausentes(self, desde, hasta=None, tipos: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Boolean mask over :attr:`personas`: out at least one day of the range."""
+        hasta = desde if hasta is None else hasta
+        persona, _, _ = self._overlapping(tipos, _day(desde), _day(hasta))
+        mask = np.zeros(len(self.personas), dtype=bool)
+        mask[persona] = True
+        return mask
+
+    def coinciden(self, tipo_a: str, tipo_b: str, desde, hasta=None) -> np.ndarray:
+        """Persons with both ``tipo_a`` and ``tipo_b`` absences within the range."""
+        return self.ausentes(desde, hasta, [tipo_a]) & self.ausentes(desde, hasta, [tipo_b])
+
+    def ruts(self, mask: np.ndarray) -> List[str]:
+        return self.personas.index[mask].tolist()
+
+    def disponibilidad(self, desde, hasta, tipos: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """One row per person with days out in the range and status on ``desde``."""
+        calendario = self._window(tipos, desde, hasta)
+        resumen = self.personas.reset_index()
+        resumen["dias_fuera"] = calendario.sum(axis=1)
+        resumen["estado"] = np.where(calendario[:, 0] if calendario.shape[1] else False, "Ausente", "Disponible")
+        return resumen
+
+
+INDEX_CACHE = BoundedCache(64 * 1024 * 1024, max_entries=16, measure=lambda index: index.nbytes())
+
+
+def absence_index(df: pd.DataFrame, version: str) -> AbsenceIndex:
+    """Index of ``df`` shared by every session on the same dataset ``version``."""
+    return INDEX_CACHE.get_or_compute(version, lambda: AbsenceIndex(df))
+
+
+def index_cache_stats() -> Dict[str, float]:
+    return INDEX_CACHE.stats()
+
+
+def detectar_conflictos(df: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Absences of the same person that overlap an earlier one.
+
+    Intervals are sorted by ``(rut, inicio)`` and each one is compared
+    with the furthest ``termino`` seen so far for that person, so every
+    overlapping record is reported once against the event that covers it.
+    Rejected or cancelled requests are ignored.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=CONFLICT_COLUMNS)
+    intervalos = metrics.intervalos_ausencia(df)
+    if "estado" in df.columns:
+        estado = df.loc[intervalos.index, "estado"].astype("string").str.strip().str.lower()
+        intervalos = intervalos[~estado.isin(ESTADOS_IGNORADOS).fillna(False).to_numpy()]
+    intervalos = intervalos[intervalos["rut"].notna().to_numpy()]
+    if len(intervalos) < 2:
+        return pd.DataFrame(columns=CONFLICT_COLUMNS)
+
+    intervalos = intervalos.rename_axis("registro").reset_index()
+    intervalos = intervalos.sort_values(["rut", "inicio", "termino"], kind="mergesort", ignore_index=True)
+    persona = pd.factorize(intervalos["rut"])[0]
+    inicio = intervalos["inicio"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+    termino = intervalos["termino"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+    alcance = pd.Series(termino).groupby(persona).cummax().to_numpy()
+    posicion = pd.Series(np.where(termino == alcance, np.arange(len(termino)), np.nan))
+    posicion = posicion.groupby(persona).ffill().to_numpy(dtype=np.int64)
+    misma = np.zeros(len(persona), dtype=bool)
+    misma[1:] = persona[1:] == persona[:-1]
+    previo, cubre = np.empty_like(alcance), np.empty_like(posicion)
+    previo[1:], cubre[1:] = alcance[:-1], posicion[:-1]
+    choque = misma & (inicio <= previo)
+    if not choque.any():
+        return pd.DataFrame(columns=CONFLICT_COLUMNS)
+
+    filas, otras = np.flatnonzero(choque), cubre[choque]
+    conflictos = intervalos.iloc[filas].reset_index(drop=True)
+    otros = intervalos.iloc[otras].reset_index(drop=True)
+    conflictos["nombre"] = df["nombre"].reindex(conflictos["registro"]).to_numpy() if "nombre" in df.columns else None
+    conflictos["conflicto_con"] = otros["registro"]
+    conflictos["tipo_conflicto"] = otros["tipo"]
+    conflictos["inicio_conflicto"] = otros["inicio"]
+    conflictos["termino_conflicto"] = otros["termino"]
+    conflictos["dias_solapados"] = np.minimum(termino[filas], termino[otras]) - inicio[filas] + 1
+    return conflictos[CONFLICT_COLUMNS]
+
+
+def conflictos_de(conflictos: Optional[pd.DataFrame], registros: Iterable) -> pd.DataFrame:
+    """Conflicts where any of ``registros`` takes part (on either side)."""
+    if conflictos is None or conflictos.empty:
+        return pd.DataFrame(columns=CONFLICT_COLUMNS)
+    registros = list(registros)
+    mask = conflictos["registro"].isin(registros) | conflictos["conflicto_con"].isin(registros)
+    return conflictos[mask.to_numpy()]
+
+
+def marcar_conflictos(df: pd.DataFrame, conflictos: Optional[pd.DataFrame]) -> pd.Series:
+    """Per row of ``df``, the other records it overlaps with ("" when none)."""
+    marcas = pd.Series("", index=df.index, dtype=object)
+    if conflictos is None or conflictos.empty:
+        return marcas
+    pares = pd.concat(
+        [
+            conflictos[["registro", "conflicto_con"]].set_axis(["registro", "otro"], axis=1),
+            conflictos[["conflicto_con", "registro"]].set_axis(["registro", "otro"], axis=1),
+        ]
+    )
+    pares = pares[pares["registro"].isin(df.index)]
+    if pares.empty:
+        return marcas
+    otros = pares.astype({"otro": str}).groupby("registro")["otro"].agg(lambda values: ", ".join(sorted(set(values))))
+    marcas.loc[otros.index] = otros.to_numpy()
+    return marcas
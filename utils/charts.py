@@ -10,7 +10,7 @@ from . import metrics
 from .colors import CHART_SEQUENCE, PALETTE, plotly_layout, with_alpha
 
 
-def line_monthly(df: pd.DataFrame) -> go.Figure:
+def line_monthly(df: metrics.MetricSource) -> go.Figure:
     trend = metrics.monthly_trend(df)
     if trend.empty:
         fig = go.Figure()
@@ -48,14 +48,10 @@ def line_monthly(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
-def bar_sede(df: pd.DataFrame) -> go.Figure:
+def bar_sede(df: metrics.MetricSource) -> go.Figure:
     if df.empty:
         return go.Figure()
-    grouped = (
-        df.groupby(["sede", "tipo_registro"])
-        .size()
-        .reset_index(name="registros")
-    )
+    grouped = metrics.registros_por_sede_tipo(df)
     fig = px.bar(
         grouped,
         x="sede",
@@ -69,14 +65,10 @@ def bar_sede(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
-def donut_tipo(df: pd.DataFrame) -> go.Figure:
+def donut_tipo(df: metrics.MetricSource) -> go.Figure:
     if df.empty:
         return go.Figure()
-    grouped = (
-        df.groupby("tipo_registro")
-        .size()
-        .reset_index(name="registros")
-    )
+    grouped = metrics.registros_por_tipo(df)
     fig = px.pie(
         grouped,
         names="tipo_registro",
@@ -90,7 +82,7 @@ def donut_tipo(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
-def bar_top_personas(df: pd.DataFrame, metric: str = "dias") -> go.Figure:
+def bar_top_personas(df: metrics.MetricSource, metric: str = "dias") -> go.Figure:
     top = metrics.top_personas(df, metric=metric)
     if top.empty:
         return go.Figure()
@@ -112,18 +104,39 @@ def bar_top_personas(df: pd.DataFrame, metric: str = "dias") -> go.Figure:
     return fig
 
 
-def heatmap_turnos(turnos: pd.DataFrame) -> go.Figure:
-    if turnos.empty:
-        return go.Figure()
-    matrix = (
-        turnos.pivot_table(
-            index="nombre",
-            columns=turnos["mes"].dt.strftime("%Y-%m"),
-            values="tipo_registro",
-            aggfunc="count",
-            fill_value=0,
+def line_ocupacion(df: metrics.MetricSource) -> go.Figure:
+    ocupacion = metrics.ocupacion_diaria(df)
+    if ocupacion.empty:
+        fig = go.Figure()
+        fig.update_layout(**plotly_layout(title="Sin ausencias en el rango seleccionado"))
+        return fig
+    fig = go.Figure()
+    for i, sede in enumerate(ocupacion.columns):
+        fig.add_trace(
+            go.Scatter(
+                x=ocupacion.index,
+                y=ocupacion[sede],
+                mode="lines",
+                name=sede,
+                line=dict(color=CHART_SEQUENCE[i % len(CHART_SEQUENCE)], width=2, shape="hv"),
+            )
+        )
+    fig.update_layout(
+        **plotly_layout(
+            title="Personas ausentes por día",
+            xaxis_title="Fecha",
+            yaxis_title="Personas",
+            hovermode="x unified",
         )
     )
+    return fig
+
+
+def heatmap_turnos(turnos: metrics.MetricSource) -> go.Figure:
+    heatmap = metrics.resumen_turnos(turnos)["heatmap"]
+    if heatmap.empty:
+        return go.Figure()
+    matrix = heatmap.set_index("nombre")
     fig = go.Figure(
         data=go.Heatmap(
             z=matrix.values,
@@ -144,3 +157,38 @@ def heatmap_turnos(turnos: pd.DataFrame) -> go.Figure:
         )
     )
     return fig
+
+
+DIAS_SEMANA = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
+
+
+def heatmap_cobertura(cobertura: pd.DataFrame, sede: str) -> go.Figure:
+    if cobertura.empty or sede not in cobertura.columns:
+        return go.Figure()
+    serie = cobertura[sede]
+    matrix = (
+        serie.groupby([serie.index.weekday, serie.index.hour])
+        .mean()
+        .unstack(fill_value=0)
+        .reindex(index=range(7), columns=range(24), fill_value=0)
+    )
+    fig = go.Figure(
+        data=go.Heatmap(
+            z=matrix.values.round(1),
+            x=[f"{hora:02d}:00" for hora in matrix.columns],
+            y=DIAS_SEMANA,
+            colorscale=[
+                [0.0, with_alpha(PALETTE["primary"], 0.04)],
+                [1.0, PALETTE["primary"]],
+            ],
+            colorbar=dict(title="Personas"),
+        )
+    )
+    fig.update_layout(
+        **plotly_layout(
+            title=f"Dotación media por hora · {sede}",
+            xaxis_title="Hora",
+            yaxis=dict(autorange="reversed"),
+        )
+    )
+    return fig
@@ -1,18 +1,34 @@
-"""Helpers to export filtered data to Excel and PDF."""
+"""Helpers to export filtered data to CSV, Excel and PDF."""
 
 from __future__ import annotations
 
 import base64
 import io
-from datetime import datetime
+import tempfile
+from datetime import date, datetime
+from numbers import Number
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+import xlsxwriter
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 from weasyprint import HTML
 
+from . import metrics
+
 EXPORT_FMT = "%Y%m%d_%H%M"
+CSV_CHUNK_ROWS = 50_000
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+XLSX_CHUNK_ROWS = 10_000
+XLSX_MAX_ROWS = 1_048_576
+EXCEL_EPOCH = np.datetime64("1899-12-30", "ns")
+CELL_FORMATS = {
+    "encabezado": {"bold": True, "bg_color": "#e2e8f0", "border": 1},
+    "fecha": {"num_format": "yyyy-mm-dd"},
+    "fecha_hora": {"num_format": "yyyy-mm-dd hh:mm:ss"},
+}
 
 
 def _fig_to_uri(fig) -> Optional[str]:
@@ -26,35 +42,119 @@ def _fig_to_uri(fig) -> Optional[str]:
     return f"data:image/png;base64,{b64}"
 
 
+def export_csv(df: pd.DataFrame, chunk_rows: int = CSV_CHUNK_ROWS):
+    """Write ``df`` as UTF-8 CSV in row chunks to a spooled temp file.
+
+    Only one chunk is rendered as text at a time and the file rolls over
+    to disk past ``SPOOL_MAX_BYTES``, so memory stays flat with the row
+    count. The output equals ``df.to_csv(index=False)``; the returned file
+    is rewound and owned by the caller.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode="w+b", suffix=".csv")
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start : start + chunk_rows]
+        spool.write(chunk.to_csv(index=False, header=start == 0).encode("utf-8"))
+    spool.seek(0)
+    return spool
+
+
+class _Formats:
+    """Cell formats of one workbook, added on first use and then reused."""
+
+    def __init__(self, workbook) -> None:
+        self._workbook = workbook
+        self._cache: Dict[str, object] = {}
+
+    def __getitem__(self, name: str):
+        if name not in self._cache:
+            self._cache[name] = self._workbook.add_format(CELL_FORMATS[name])
+        return self._cache[name]
+
+
+def _write_value(worksheet, row: int, col: int, value, formats: _Formats) -> None:
+    """Type-dispatched write for cells of mixed ``object`` columns."""
+    if value is None or value is pd.NaT or value is pd.NA:
+        return
+    if isinstance(value, (bool, np.bool_)):
+        worksheet.write_boolean(row, col, bool(value))
+    elif isinstance(value, Number):
+        if np.isfinite(value):
+            worksheet.write_number(row, col, float(value))
+    elif isinstance(value, datetime):
+        worksheet.write_datetime(row, col, pd.Timestamp(value).tz_localize(None).to_pydatetime(), formats["fecha_hora"])
+    elif isinstance(value, date):
+        worksheet.write_datetime(row, col, datetime.combine(value, datetime.min.time()), formats["fecha"])
+    else:
+        worksheet.write_string(row, col, str(value))
+
+
+def _column_cells(worksheet, column: pd.Series, formats: _Formats) -> Tuple[list, Callable, object]:
+    """Values of ``column`` (``None`` for blanks), the write method and its format.
+
+    Dates become Excel serial numbers and numbers plain floats in one
+    vectorized pass, so the row loop only dispatches on ``None``.
+    """
+    if isinstance(column.dtype, pd.DatetimeTZDtype):
+        column = column.dt.tz_localize(None)
+    if pd.api.types.is_datetime64_dtype(column.dtype):
+        stamps = column.to_numpy(dtype="datetime64[ns]")
+        serial = (stamps - EXCEL_EPOCH) / np.timedelta64(1, "D")
+        values = np.where(np.isnat(stamps), None, serial).tolist()
+        return values, worksheet.write_number, formats["fecha_hora"]
+    if pd.api.types.is_bool_dtype(column.dtype):
+        values = column.astype(object).where(column.notna(), None).tolist()
+        return values, worksheet.write_boolean, None
+    if pd.api.types.is_numeric_dtype(column.dtype):
+        numbers = column.to_numpy(dtype=float, na_value=np.nan)
+        return np.where(np.isfinite(numbers), numbers, None).tolist(), worksheet.write_number, None
+    values = column.astype(object).where(column.notna(), None).tolist()
+    if all(value is None or isinstance(value, str) for value in values):
+        return values, worksheet.write_string, None
+    return values, lambda row, col, value, _: _write_value(worksheet, row, col, value, formats), None
+
+
+def _write_sheet(workbook, name: str, df: pd.DataFrame, formats: _Formats) -> None:
+    """Write ``df`` row by row, as ``constant_memory`` mode requires."""
+    if len(df) >= XLSX_MAX_ROWS:
+        raise ValueError(f"La hoja {name} supera el máximo de {XLSX_MAX_ROWS - 1:,} filas de Excel.")
+    worksheet = workbook.add_worksheet(name)
+    worksheet.set_zoom(90)
+    worksheet.freeze_panes(1, 0)
+    worksheet.set_row(0, 20, formats["encabezado"])
+    for col, label in enumerate(df.columns):
+        worksheet.write_string(0, col, str(label), formats["encabezado"])
+    for start in range(0, len(df), XLSX_CHUNK_ROWS):
+        block = df.iloc[start : start + XLSX_CHUNK_ROWS]
+        columns = [_column_cells(worksheet, block.iloc[:, col], formats) for col in range(block.shape[1])]
+        for offset in range(len(block)):
+            row = start + offset + 1
+            for col, (values, write, fmt) in enumerate(columns):
+                value = values[offset]
+                if value is not None:
+                    write(row, col, value, fmt)
+
+
 def export_excel(
     df: pd.DataFrame,
-    resumen: Dict[str, pd.DataFrame],
-    turnos: Dict[str, pd.DataFrame],
+    metricas: metrics.MetricSet,
+    conflictos: Optional[pd.DataFrame] = None,
 ) -> io.BytesIO:
+    """Workbook with the detail rows and the summaries of ``metricas``.
+
+    The workbook streams in xlsxwriter ``constant_memory`` mode, so only the
+    row being written is held as cells. Resumen, Turnos and Pivotes come
+    from the memoized metrics of the set rather than being recomputed.
+    """
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, sheet_name="Detalle", index=False)
-
-        resumen_sheet = resumen.get("totales")
-        if resumen_sheet is not None:
-            resumen_sheet.to_excel(writer, sheet_name="Resumen", index=False)
-
-        turnos_sheet = turnos.get("resumen")
-        if turnos_sheet is not None:
-            turnos_sheet.to_excel(writer, sheet_name="Turnos", index=False)
-
-        pivote = resumen.get("pivote")
-        if pivote is not None:
-            pivote.to_excel(writer, sheet_name="Pivotes", index=False)
-
-        workbook = writer.book
-        fmt_header = workbook.add_format(
-            {"bold": True, "bg_color": "#e2e8f0", "border": 1}
-        )
-        for sheet_name, worksheet in writer.sheets.items():
-            worksheet.set_zoom(90)
-            worksheet.freeze_panes(1, 0)
-            worksheet.set_row(0, 20, fmt_header)
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    formats = _Formats(workbook)
+    _write_sheet(workbook, "Detalle", df, formats)
+    _write_sheet(workbook, "Resumen", metrics.kpi_totals(metricas), formats)
+    _write_sheet(workbook, "Turnos", metrics.resumen_turnos(metricas.turnos())["resumen"], formats)
+    _write_sheet(workbook, "Pivotes", metrics.dias_por_sede(metricas), formats)
+    if conflictos is not None and not conflictos.empty:
+        _write_sheet(workbook, "Conflictos", conflictos, formats)
+    workbook.close()
     output.seek(0)
     return output
 
@@ -79,7 +179,7 @@ def export_pdf(
     tabla = {
         "columns": ["Sede", "Persona", "Registros", "Días"],
         "rows": (
-            df.groupby(["sede", "nombre"])
+            df.groupby(["sede", "nombre"], observed=True)
             .agg(registros=("tipo_registro", "count"), dias=("dias", "sum"))
             .reset_index()
             .values.tolist()
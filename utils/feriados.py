@@ -0,0 +1,113 @@
+"""Chilean holiday calendar and vectorized business-day arithmetic."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import yaml
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+HOLIDAYS_PATH = BASE_DIR / "config" / "feriados_cl.csv"
+CONFIG_PATH = BASE_DIR / "config" / "config.yaml"
+WEEKMASK = "1111100"
+
+
+def _as_days(values) -> np.ndarray:
+    """Coerce dates, timestamps or arrays of them to ``datetime64[D]``."""
+    return np.asarray(pd.to_datetime(values), dtype="datetime64[ns]").astype("datetime64[D]")
+
+
+def _override_days(overrides: Optional[Dict]) -> List[np.datetime64]:
+    days: List[np.datetime64] = []
+    for values in (overrides or {}).values():
+        days.extend(_as_days(values if isinstance(values, (list, tuple)) else [values]))
+    return days
+
+
+class BusinessCalendar:
+    """Monday-to-Friday calendar without the given holidays.
+
+    ``count`` and ``offset`` take scalars or whole arrays and run in
+    constant time per element through :func:`numpy.busday_count`.
+    """
+
+    def __init__(self, holidays: Iterable[np.datetime64] = ()) -> None:
+        self.holidays = np.unique(np.asarray(list(holidays), dtype="datetime64[D]"))
+        self._calendar = np.busdaycalendar(weekmask=WEEKMASK, holidays=self.holidays)
+        self.digest = hashlib.sha256(self.holidays.astype("int64").tobytes()).hexdigest()[:16]
+
+    def is_busday(self, dates) -> np.ndarray:
+        return np.is_busday(_as_days(dates), busdaycal=self._calendar)
+
+    def count(self, start, end) -> np.ndarray:
+        """Business days from ``start`` to ``end`` inclusive (order-insensitive)."""
+        start, end = _as_days(start), _as_days(end)
+        first, last = np.minimum(start, end), np.maximum(start, end)
+        return np.busday_count(first, last + np.timedelta64(1, "D"), busdaycal=self._calendar)
+
+    def offset(self, start, days) -> np.ndarray:
+        """Date of the ``days``-th business day counting ``start`` (or the next one) as 1."""
+        steps = np.maximum(np.asarray(days, dtype=np.int64) - 1, 0)
+        return np.busday_offset(_as_days(start), steps, roll="forward", busdaycal=self._calendar)
+
+
+def read_holidays(path: Union[str, Path] = HOLIDAYS_PATH) -> pd.DataFrame:
+    path = Path(path)
+    if not path.exists():
+        return pd.DataFrame(columns=["fecha", "nombre"])
+    frame = pd.read_csv(path, encoding="utf-8")
+    frame["fecha"] = pd.to_datetime(frame["fecha"], format="%Y-%m-%d", errors="coerce")
+    return frame.dropna(subset=["fecha"])
+
+
+def build_calendar(
+    settings: Optional[Dict] = None,
+    path: Union[str, Path] = HOLIDAYS_PATH,
+) -> BusinessCalendar:
+    """Holidays from ``path`` plus the per-year ``agregar``/``quitar`` overrides."""
+    settings = settings or {}
+    holidays = set(_as_days(read_holidays(path)["fecha"]))
+    holidays.update(_override_days(settings.get("agregar")))
+    holidays.difference_update(_override_days(settings.get("quitar")))
+    return BusinessCalendar(sorted(holidays))
+
+
+def _mtime(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+@lru_cache(maxsize=4)
+def _cached_calendar(config_version: int, holidays_version: int) -> BusinessCalendar:
+    _ = holidays_version
+    settings = {}
+    if config_version:
+        settings = (yaml.safe_load(CONFIG_PATH.read_text(encoding="utf-8-sig")) or {}).get("feriados", {})
+    return build_calendar(settings)
+
+
+def default_calendar() -> BusinessCalendar:
+    """Calendar from the holidays file and ``feriados`` in config.yaml, reloaded when either changes."""
+    return _cached_calendar(_mtime(CONFIG_PATH), _mtime(HOLIDAYS_PATH))
+
+
+@lru_cache(maxsize=8)
+def _settings_calendar(settings_json: str, holidays_version: int) -> BusinessCalendar:
+    _ = holidays_version
+    return build_calendar(json.loads(settings_json))
+
+
+def calendar_for(settings: Optional[Dict] = None) -> BusinessCalendar:
+    """Calendar for a ``feriados`` config section, e.g. the session's; ``None`` reads config.yaml."""
+    if settings is None:
+        return default_calendar()
+    settings_json = json.dumps(settings, sort_keys=True, ensure_ascii=False, default=str)
+    return _settings_calendar(settings_json, _mtime(HOLIDAYS_PATH))
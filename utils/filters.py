@@ -2,12 +2,16 @@
 
 from __future__ import annotations
 
+import weakref
 from copy import deepcopy
 from datetime import date
-from typing import Dict, List, Mapping, Tuple
+from typing import Dict, List, Mapping, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from .cache import BoundedCache, detach
+
 DEFAULT_FILTERS = {
     "sede": [],
     "personas": [],
@@ -24,49 +28,229 @@ def default_filters() -> Dict:
     return deepcopy(DEFAULT_FILTERS)
 
 
-def apply_filters(df: pd.DataFrame, filtros: Dict) -> pd.DataFrame:
-    filtered = df.copy()
-    if filtered.empty:
-        return filtered
-    if filtros.get("sede"):
-        filtered = filtered[filtered["sede"].isin(filtros["sede"])]
-    if filtros.get("personas"):
-        filtered = filtered[filtered["nombre"].isin(filtros["personas"])]
-    if filtros.get("tipo"):
-        filtered = filtered[filtered["tipo_registro"].isin(filtros["tipo"])]
-    if filtros.get("subtipo"):
-        filtered = filtered[filtered["subtipo"].isin(filtros["subtipo"])]
-    if filtros.get("estado"):
-        filtered = filtered[filtered["estado"].isin(filtros["estado"])]
-    if filtros.get("anios"):
-        filtered = filtered[
-            filtered["fecha_inicio"].dt.year.isin(set(filtros["anios"]))
-        ]
-    if filtros.get("meses"):
-        filtered = filtered[
-            filtered["fecha_inicio"].dt.month.isin(set(filtros["meses"]))
-        ]
-    if filtros.get("fecha_rango"):
-        start, end = filtros["fecha_rango"]
-        if start:
-            filtered = filtered[filtered["fecha_inicio"] >= pd.Timestamp(start)]
-        if end:
-            filtered = filtered[filtered["fecha_inicio"] <= pd.Timestamp(end)]
-    return filtered
-
-
-def list_options(df: pd.DataFrame) -> Dict[str, List]:
+FILTER_COLUMNS = {
+    "sede": "sede",
+    "personas": "nombre",
+    "tipo": "tipo_registro",
+    "subtipo": "subtipo",
+    "estado": "estado",
+}
+OPTION_KEYS = {
+    "sede": "sedes",
+    "personas": "personas",
+    "tipo": "tipos",
+    "subtipo": "subtipos",
+    "estado": "estados",
+}
+NAT_KEY = np.iinfo(np.int64).max
+COUNT_MEMO = 32
+VIEW_CACHE = BoundedCache(32 * 1024 * 1024, max_entries=256)
+
+
+def filter_key(filtros: Dict) -> Tuple:
+    """Order-insensitive, hashable form of a filter state; empty filters drop out."""
+    items = []
+    for key in sorted(filtros or {}):
+        value = filtros[key]
+        if isinstance(value, dict):
+            value = filter_key(value)
+        elif isinstance(value, (list, set)):
+            value = tuple(sorted(str(item) for item in value))
+        elif isinstance(value, tuple):
+            value = tuple(item.isoformat() if hasattr(item, "isoformat") else item for item in value)
+            if not any(item is not None for item in value):
+                value = ()
+        if value in (None, "", ()):
+            continue
+        items.append((key, value))
+    return tuple(items)
+
+
+class FilterIndex:
+    """Lookups that let :func:`apply_filters` combine masks without copies.
+
+    Keeps, per filtered column, the integer codes of each row (categorical
+    codes when available), the year and month of ``fecha_inicio`` and the
+    row order sorted by date so ranges are cut with ``searchsorted``. Each
+    piece is built on first use and reused for the lifetime of the frame.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self._source = weakref.ref(df)
+        self._codes: Dict[str, Tuple[np.ndarray, pd.Index]] = {}
+        self._fechas: Optional[Dict[str, np.ndarray]] = None
+        self._options: Optional[Dict[str, List]] = None
+        self._counts: Dict[Tuple, Dict[str, Dict]] = {}
+
+    @property
+    def alive(self) -> bool:
+        return self._source() is not None
+
+    @property
+    def rows(self) -> int:
+        source = self._source()
+        return 0 if source is None else len(source)
+
+    def built_from(self, df: Optional[pd.DataFrame]) -> bool:
+        return df is not None and self._source() is df
+
+    def _column(self, column: str) -> Tuple[np.ndarray, pd.Index]:
+        if column not in self._codes:
+            series = self._source()[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                self._codes[column] = (series.cat.codes.to_numpy(), series.cat.categories)
+            else:
+                codes, uniques = pd.factorize(series)
+                self._codes[column] = (codes, pd.Index(uniques))
+        return self._codes[column]
+
+    def _dates(self) -> Dict[str, np.ndarray]:
+        if self._fechas is None:
+            values = self._source()["fecha_inicio"].to_numpy(dtype="datetime64[ns]")
+            nat = np.isnat(values)
+            keys = np.where(nat, NAT_KEY, values.view(np.int64))
+            order = np.argsort(keys, kind="stable")
+            self._fechas = {
+                "valida": ~nat,
+                "anio": values.astype("datetime64[Y]").astype(np.int64) + 1970,
+                "mes": values.astype("datetime64[M]").astype(np.int64) % 12 + 1,
+                "orden": order,
+                "claves": keys[order],
+            }
+        return self._fechas
+
+    def _isin(self, column: str, values) -> np.ndarray:
+        codes, uniques = self._column(column)
+        lookup = np.append(uniques.isin(list(values)), False)
+        return lookup[codes]
+
+    def _range(self, start, end) -> np.ndarray:
+        fechas = self._dates()
+        claves = fechas["claves"]
+        lo = np.searchsorted(claves, pd.Timestamp(start).as_unit("ns").value, "left") if start else 0
+        hi = (
+            np.searchsorted(claves, pd.Timestamp(end).as_unit("ns").value, "right")
+            if end
+            else np.searchsorted(claves, NAT_KEY, "left")
+        )
+        mask = np.zeros(len(claves), dtype=bool)
+        mask[fechas["orden"][lo:hi]] = True
+        return mask
+
+    def mask(self, filtros: Dict) -> Optional[np.ndarray]:
+        """Rows matching ``filtros``, or ``None`` when nothing is filtered."""
+        mask: Optional[np.ndarray] = None
+
+        def _and(part: np.ndarray) -> None:
+            nonlocal mask
+            mask = part if mask is None else mask & part
+
+        for key, column in FILTER_COLUMNS.items():
+            if filtros.get(key):
+                _and(self._isin(column, filtros[key]))
+        for key, part in (("anios", "anio"), ("meses", "mes")):
+            if filtros.get(key):
+                fechas = self._dates()
+                wanted = pd.to_numeric(pd.Series(list(filtros[key])), errors="coerce").dropna()
+                _and(fechas["valida"] & np.isin(fechas[part], wanted.to_numpy()))
+        if filtros.get("fecha_rango"):
+            start, end = filtros["fecha_rango"]
+            if start or end:
+                _and(self._range(start, end))
+        return mask
+
+    def positions(self, filtros: Dict) -> Optional[np.ndarray]:
+        """Row positions matching ``filtros`` (read-only), or ``None`` for all rows."""
+        mask = self.mask(filtros)
+        if mask is None:
+            return None
+        positions = np.flatnonzero(mask)
+        if len(mask) <= np.iinfo(np.int32).max:
+            positions = positions.astype(np.int32)
+        positions.flags.writeable = False
+        return positions
+
+    def options(self) -> Dict[str, List]:
+        """Sorted values present in each facet, as :func:`list_options` returns them."""
+        if self._options is None:
+            options: Dict[str, List] = {}
+            for key, column in FILTER_COLUMNS.items():
+                codes, uniques = self._column(column)
+                present = np.bincount(codes[codes >= 0], minlength=len(uniques)) > 0
+                options[OPTION_KEYS[key]] = sorted(uniques[present].tolist())
+            fechas = self._dates()
+            for key, part in (("anios", "anio"), ("meses", "mes")):
+                options[key] = np.unique(fechas[part][fechas["valida"]]).tolist()
+            self._options = options
+        return self._options
+
+    def facet_counts(self, filtros: Dict, facets=tuple(FILTER_COLUMNS)) -> Dict[str, Dict]:
+        """Rows per option of each facet under every *other* active filter.
+
+        One ``bincount`` over the codes per facet; results are memoized per
+        filter state so reruns with the same selection cost nothing.
+        """
+        key = (filter_key(filtros), tuple(facets))
+        if key in self._counts:
+            return self._counts[key]
+        counts: Dict[str, Dict] = {}
+        for facet in facets:
+            codes, uniques = self._column(FILTER_COLUMNS[facet])
+            mask = self.mask({name: value for name, value in filtros.items() if name != facet})
+            selected = codes if mask is None else codes[mask]
+            tally = np.bincount(selected[selected >= 0], minlength=len(uniques))
+            counts[facet] = dict(zip(uniques.tolist(), tally.tolist()))
+        if len(self._counts) >= COUNT_MEMO:
+            self._counts.pop(next(iter(self._counts)))
+        self._counts[key] = counts
+        return counts
+
+
+def filtered_positions(index: FilterIndex, filtros: Dict, version: str) -> Optional[np.ndarray]:
+    """Positions for ``filtros`` shared by every page and session on ``version``.
+
+    ``version`` must identify the exact frame the index was built from
+    (dataset version plus which frame); the arrays are small and read-only.
+    Cached positions that fall outside the indexed frame are recomputed.
+    """
+    key = (version, filter_key(filtros))
+    positions = VIEW_CACHE.get_or_compute(key, lambda: index.positions(filtros))
+    if positions is not None and len(positions) and positions[-1] >= index.rows:
+        positions = index.positions(filtros)
+        VIEW_CACHE.put(key, positions)
+    return positions
+
+
+def view_cache_stats() -> Dict[str, float]:
+    return VIEW_CACHE.stats()
+
+
+def apply_filters(
+    df: pd.DataFrame,
+    filtros: Dict,
+    index: Optional[FilterIndex] = None,
+    version: Optional[str] = None,
+) -> pd.DataFrame:
+    """Rows of ``df`` matching ``filtros``, materialized once from the combined mask.
+
+    With a ``version`` the row positions come from :data:`VIEW_CACHE`.
+    """
+    if df.empty:
+        return detach(df)
+    if index is None or not index.built_from(df):
+        index = FilterIndex(df)
+    positions = filtered_positions(index, filtros, version) if version else index.positions(filtros)
+    if positions is None:
+        return detach(df)
+    return df.iloc[positions]
+
+
+def list_options(df: pd.DataFrame, index: Optional[FilterIndex] = None) -> Dict[str, List]:
     if df.empty:
         return {key: [] for key in DEFAULT_FILTERS if key != "fecha_rango"}
-    return {
-        "sedes": sorted(df["sede"].dropna().unique().tolist()),
-        "personas": sorted(df["nombre"].dropna().unique().tolist()),
-        "tipos": sorted(df["tipo_registro"].dropna().unique().tolist()),
-        "subtipos": sorted(df["subtipo"].dropna().unique().tolist()),
-        "estados": sorted(df["estado"].dropna().unique().tolist()),
-        "anios": sorted(df["fecha_inicio"].dt.year.dropna().unique().tolist()),
-        "meses": sorted(df["fecha_inicio"].dt.month.dropna().unique().tolist()),
-    }
+    if index is None or not index.built_from(df):
+        index = FilterIndex(df)
+    return index.options()
 
 
 def to_query_params(filters: Dict, prefix: str = "flt") -> Dict[str, str]:
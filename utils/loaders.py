@@ -2,15 +2,49 @@
 
 from __future__ import annotations
 
+import csv
+import difflib
+import hashlib
 import io
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
 import unicodedata
+import warnings
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import date, datetime
 from pathlib import Path
-from typing import Dict, Iterable, Optional, Tuple, Union
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
-import streamlit as st
 
+from . import feriados
 from . import metrics
+from .cache import BoundedCache, detach
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    HAS_PARQUET = True
+except Exception:  # pragma: no cover
+    HAS_PARQUET = False
+
+try:
+    import python_calamine  # noqa: F401
+
+    EXCEL_ENGINE = "calamine"
+except Exception:  # pragma: no cover
+    EXCEL_ENGINE = None
 
 EXPECTED_COLUMNS = [
     "rut",
@@ -32,6 +66,21 @@ EXPECTED_COLUMNS = [
 
 REQUIRED_COLUMNS = {"rut", "nombre", "sede", "tipo_registro", "fecha_inicio", "fecha_termino"}
 
+CATEGORY_COLUMNS = [
+    "rut",
+    "nombre",
+    "cargo",
+    "sede",
+    "tipo_registro",
+    "subtipo",
+    "estado",
+    "turno_codigo",
+]
+
+FLOAT32_COLUMNS = ["dias", "horas"]
+ID_COLUMN = "registro_id"
+LOGGER = logging.getLogger(__name__)
+
 
 def _slug(text: str) -> str:
     text = str(text or "").strip().lower()
@@ -61,9 +110,85 @@ def _ensure_buffer(
     raise ValueError("Fuente de datos no soportada")
 
 
+WORKBOOK_SHEETS = ("BBDD", "Tipos")
+
+
+def workbook_version(path: Union[str, Path]) -> str:
+    stat = Path(path).stat()
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _parse_workbook(path_str: str) -> Dict[str, pd.DataFrame]:
+    with pd.ExcelFile(path_str, engine=EXCEL_ENGINE) as book:
+        names = book.sheet_names
+        wanted = [name for name in WORKBOOK_SHEETS if name in names]
+        if "BBDD" not in wanted and names:
+            wanted.insert(0, names[0])
+        return {name: book.parse(name) for name in dict.fromkeys(wanted)}
+
+
+def _data_sheet(sheets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    return sheets.get("BBDD", next(iter(sheets.values()), pd.DataFrame()))
+
+
+def read_workbook(path: Union[str, Path]) -> Dict[str, pd.DataFrame]:
+    """Parse the BBDD and Tipos sheets in one open of the workbook, cached per file version.
+
+    The raw sheets live in :data:`LOAD_CACHE`, so they count against its byte
+    budget; callers get detached frames. When there is no ``BBDD`` sheet the
+    first sheet is parsed (and listed first).
+    """
+    path_str = str(Path(path).resolve())
+    key = f"workbook::{path_str}::{workbook_version(path_str)}"
+    sheets = LOAD_CACHE.get_or_compute(key, lambda: _parse_workbook(path_str))
+    return {name: detach(frame) for name, frame in sheets.items()}
+
+
+UPLOAD_DIR = Path(tempfile.gettempdir()) / "crenal_uploads"
+UPLOAD_MAX_AGE = 24 * 3600
+SPOOL_CHUNK = 1 << 20
+
+
+def _prune_spool(directory: Path, keep: Path) -> None:
+    limit = time.time() - UPLOAD_MAX_AGE
+    for item in directory.iterdir():
+        try:
+            if item != keep and item.stat().st_mtime < limit:
+                item.unlink()
+        except OSError:
+            continue
+
+
+def spool_upload(uploaded, directory: Optional[Union[str, Path]] = None) -> Dict[str, str]:
+    """Stream an upload to a content-addressed file, hashing it on the way.
+
+    Returns ``path``, ``digest`` and ``name``; identical uploads share one file.
+    """
+    directory = Path(directory or UPLOAD_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = getattr(uploaded, "name", None) or "upload"
+    digest = hashlib.sha256()
+    if hasattr(uploaded, "seek"):
+        uploaded.seek(0)
+    fd, tmp_name = tempfile.mkstemp(dir=directory, suffix=".part")
+    with os.fdopen(fd, "wb") as fh:
+        for chunk in iter(lambda: uploaded.read(SPOOL_CHUNK), b""):
+            digest.update(chunk)
+            fh.write(chunk)
+    target = directory / f"{digest.hexdigest()}{Path(name).suffix.lower()}"
+    if target.exists():
+        os.unlink(tmp_name)
+    else:
+        os.replace(tmp_name, target)
+    _prune_spool(directory, target)
+    return {"path": str(target), "digest": digest.hexdigest(), "name": name}
+
+
 def _read_df(handle, ext: Optional[str], **kwargs) -> pd.DataFrame:
     if isinstance(handle, (str, Path)):
         ext = Path(handle).suffix.lower()
+        if ext in {".xlsx", ".xls", ".xlsm"} and not kwargs:
+            return _data_sheet(read_workbook(handle))
     if ext in {".xlsx", ".xls", ".xlsm"}:
         try:
             return pd.read_excel(handle, sheet_name="BBDD", **kwargs)
@@ -72,20 +197,186 @@ def _read_df(handle, ext: Optional[str], **kwargs) -> pd.DataFrame:
                 handle.seek(0)
             return pd.read_excel(handle, **kwargs)
     if ext == ".parquet":
+        if isinstance(handle, (str, Path)):
+            kwargs.setdefault("memory_map", True)
         return pd.read_parquet(handle, **kwargs)
     if ext == ".csv":
+        kwargs.setdefault("encoding", _sniff_encoding(handle))
         return pd.read_csv(handle, sep=None, engine="python", **kwargs)
     try:
         return pd.read_excel(handle, **kwargs)
     except Exception:
-        handle.seek(0)
+        if hasattr(handle, "seek"):
+            handle.seek(0)
+    kwargs.setdefault("encoding", _sniff_encoding(handle))
     return pd.read_csv(handle, sep=None, engine="python", **kwargs)
 
 
+PROBE_ROWS = 50
+PROBE_SNIFF_BYTES = 64 * 1024
+
+
+def _csv_encoding(head: bytes) -> str:
+    """UTF-8 (BOM-aware) when ``head`` decodes as such, else latin-1 (Excel exports)."""
+    try:
+        head.decode("utf-8-sig")
+    except UnicodeDecodeError as exc:
+        # A multi-byte character cut at the end of the sample is still UTF-8.
+        if exc.reason != "unexpected end of data":
+            return "latin-1"
+    return "utf-8-sig"
+
+
+def _sniff_encoding(handle) -> str:
+    if isinstance(handle, (str, Path)):
+        with Path(handle).open("rb") as fh:
+            head = fh.read(PROBE_SNIFF_BYTES)
+    elif hasattr(handle, "read") and hasattr(handle, "seek"):
+        head = handle.read(PROBE_SNIFF_BYTES)
+        handle.seek(0)
+    else:
+        return "utf-8-sig"
+    return _csv_encoding(head) if isinstance(head, bytes) else "utf-8-sig"
+
+
+_MAGIC_SUFFIXES = {b"PK": ".xlsx", b"PAR1": ".parquet", b"\xd0\xcf\x11\xe0": ".xls"}
+
+
+def _probe_suffix(handle, ext: Optional[str]) -> str:
+    if ext:
+        return Path(ext).suffix.lower() or ext.lower()
+    head = handle.read(4)
+    handle.seek(0)
+    for magic, suffix in _MAGIC_SUFFIXES.items():
+        if head.startswith(magic):
+            return suffix
+    return ".csv"
+
+
+def _dedupe_header(names: List[str]) -> List[str]:
+    """Rename repeated headers ``x, x.1, x.2`` as ``read_excel`` does.
+
+    Suffixes already taken by another header are skipped, so the probe and
+    the full load agree on every column name.
+    """
+    original = set(names)
+    counts: Dict[str, int] = {}
+    result = []
+    for name in names:
+        count = counts.get(name, 0)
+        renamed = name
+        while count > 0:
+            counts[name] = count + 1
+            renamed = f"{name}.{count}"
+            count = count + 1 if renamed in original else counts.get(renamed, 0)
+        result.append(renamed)
+        counts[renamed] = count + 1
+    return result
+
+
+def _probe_xlsx(handle, rows: int) -> pd.DataFrame:
+    from openpyxl import load_workbook
+
+    book = load_workbook(handle, read_only=True, data_only=True)
+    try:
+        sheet = book["BBDD"] if "BBDD" in book.sheetnames else book.worksheets[0]
+        values = list(sheet.iter_rows(max_row=rows + 1, values_only=True))
+    finally:
+        book.close()
+    if not values:
+        return pd.DataFrame()
+    header = _dedupe_header(
+        [str(value) if value is not None else f"Unnamed: {i}" for i, value in enumerate(values[0])]
+    )
+    sample = pd.DataFrame(values[1:], columns=header).infer_objects()
+    unnamed = [name for value, name in zip(values[0], header) if value is None and sample[name].isna().all()]
+    return sample.drop(columns=unnamed)
+
+
+def _probe_csv(handle, rows: int) -> pd.DataFrame:
+    head = handle.read(PROBE_SNIFF_BYTES)
+    handle.seek(0)
+    encoding = _csv_encoding(head) if isinstance(head, bytes) else None
+    text = head.decode(encoding, errors="ignore") if encoding else head
+    try:
+        delimiter = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;\t|").delimiter
+    except csv.Error:
+        delimiter = ","
+    return pd.read_csv(handle, sep=delimiter, engine="c", nrows=rows, encoding=encoding)
+
+
+def _probe_parquet(handle, rows: int) -> pd.DataFrame:
+    if not HAS_PARQUET:
+        return pd.read_parquet(handle).head(rows)
+    parquet = pq.ParquetFile(handle)
+    batch = next(parquet.iter_batches(batch_size=rows), None)
+    if batch is None:
+        return parquet.schema_arrow.empty_table().to_pandas()
+    return batch.to_pandas()
+
+
+def suggest_mapping(columns: Iterable[str], mapping: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Match each expected field to a source column: configured name, slug, then close slug."""
+    columns = [str(col) for col in columns]
+    suggested = {
+        target: source
+        for source, target in _build_mapping(pd.DataFrame(columns=columns), mapping or {}).items()
+    }
+    slugs = {_slug(col): col for col in columns if col not in suggested.values()}
+    for target in EXPECTED_COLUMNS:
+        if target in suggested:
+            continue
+        close = difflib.get_close_matches(_slug((mapping or {}).get(target) or target), slugs, n=1, cutoff=0.75)
+        if close:
+            suggested[target] = slugs.pop(close[0])
+    return suggested
+
+
+def probe_schema(
+    source: Union[str, Path, bytes, io.BytesIO],
+    mapping: Optional[Dict[str, str]] = None,
+    rows: int = PROBE_ROWS,
+) -> Dict[str, object]:
+    """Read only the header and a small sample of ``source``.
+
+    Returns ``columns``, ``dtypes`` (inferred from the sample), ``suggested``
+    (expected field -> source column), ``sample`` and ``seconds``.
+    """
+    started = time.perf_counter()
+    if isinstance(source, (str, Path)):
+        handle, ext = Path(source), Path(source).suffix.lower()
+    elif hasattr(source, "read") and hasattr(source, "seek"):
+        source.seek(0)
+        handle, ext = source, getattr(source, "name", None)
+    else:
+        handle, ext = _ensure_buffer(source)
+    if not isinstance(handle, Path):
+        ext = _probe_suffix(handle, ext)
+    if ext in {".xlsx", ".xlsm"}:
+        sample = _probe_xlsx(handle, rows)
+    elif ext == ".parquet":
+        sample = _probe_parquet(handle, rows)
+    elif ext == ".csv" and isinstance(handle, Path):
+        with handle.open("rb") as fh:
+            sample = _probe_csv(fh, rows)
+    elif ext == ".csv":
+        sample = _probe_csv(handle, rows)
+    else:
+        sample = _read_df(handle, ext, nrows=rows)
+    columns = [str(col) for col in sample.columns]
+    return {
+        "columns": columns,
+        "dtypes": {
+            col: pd.api.types.infer_dtype(sample[col], skipna=True) for col in sample.columns
+        },
+        "suggested": suggest_mapping(columns, mapping),
+        "sample": sample,
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
 def peek_columns(source: Union[str, Path, bytes]) -> Iterable[str]:
-    handle, ext = _ensure_buffer(source)
-    df = _read_df(handle, ext, nrows=0)
-    return df.columns.tolist()
+    return probe_schema(source)["columns"]
 
 
 def _build_mapping(df: pd.DataFrame, mapping: Dict[str, str]) -> Dict[str, str]:
@@ -103,17 +394,24 @@ def _build_mapping(df: pd.DataFrame, mapping: Dict[str, str]) -> Dict[str, str]:
     return rename_map
 
 
-def _normalize_sede(value: str, equivalencias: Dict[str, str]) -> str:
+SEDES_CANONICAS = {
+    "quilpue": "Quilpué",
+    "villa_alemana": "Villa Alemana",
+    "vina_del_mar": "Viña del Mar",
+}
+
+
+def _slug_keys(equivalencias: Optional[Dict[str, str]]) -> Dict[str, str]:
+    return {_slug(k): v for k, v in (equivalencias or {}).items()}
+
+
+def _normalize_sede(value, equivalencias_slug: Dict[str, str]) -> Optional[str]:
+    if pd.isna(value) or not str(value).strip():
+        return None
     base = _slug(value)
-    equivalencias_slug = {_slug(k): v for k, v in equivalencias.items()}
     if base in equivalencias_slug:
         return equivalencias_slug[base]
-    allowed = {
-        "quilpue": "Quilpué",
-        "villa_alemana": "Villa Alemana",
-        "vina_del_mar": "Viña del Mar",
-    }
-    return allowed.get(base, str(value).title())
+    return SEDES_CANONICAS.get(base, str(value).title())
 
 
 def _title_or_none(value):
@@ -125,11 +423,141 @@ def _title_or_none(value):
     return text.title()
 
 
+def _normalize_subtipo(value, equivalencias_slug: Dict[str, str]) -> Optional[str]:
+    titled = _title_or_none(value)
+    if titled is None:
+        return None
+    return equivalencias_slug.get(_slug(value), titled)
+
+
+def _normalize_estado(value) -> Optional[str]:
+    if pd.isna(value):
+        return "Pendiente"
+    return value.title() if isinstance(value, str) else None
+
+
+def _map_unique(series: pd.Series, func: Callable) -> pd.Series:
+    """Apply ``func`` once per distinct value and broadcast it back through the codes."""
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    mapped = np.array([func(value) for value in uniques] + [None], dtype=object)
+    return pd.Series(mapped[codes], index=series.index, dtype=object).infer_objects()
+
+
+def _rules_for(tipos: pd.Series, reglas: Dict[str, str]) -> np.ndarray:
+    codes, uniques = pd.factorize(tipos, use_na_sentinel=False)
+    por_tipo = np.array(
+        [reglas.get(_slug(tipo), "naturales") for tipo in uniques], dtype=object
+    )
+    return por_tipo[codes] if len(por_tipo) else np.array([], dtype=object)
+
+
+DATE_FORMATS = (
+    "%d-%m-%Y",
+    "%d/%m/%Y",
+    "%d-%m-%Y %H:%M",
+    "%d/%m/%Y %H:%M",
+    "%d-%m-%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%d.%m.%Y",
+    "%d-%m-%y",
+    "%d/%m/%y",
+    "%Y/%m/%d",
+    "ISO8601",
+)
+DATE_SAMPLE = 200
+_DATE_STATS = {"filas": 0, "lentas": 0, "formatos": {}}
+_DATE_LOCK = threading.Lock()
+
+
+def _strict_dates(values: pd.Series, fmt: str) -> pd.Series:
+    try:
+        parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+    except ValueError:  # mixed UTC offsets: leave them to the slow path
+        return pd.Series(pd.NaT, index=values.index, dtype="datetime64[us]")
+    return parsed.dt.tz_localize(None) if parsed.dt.tz is not None else parsed
+
+
+def _detect_date_format(values: pd.Series) -> Optional[str]:
+    sample = values.iloc[:DATE_SAMPLE]
+    best, best_hits = None, 0
+    for fmt in DATE_FORMATS:
+        hits = int(_strict_dates(sample, fmt).notna().sum())
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+            if hits == len(sample):
+                break
+    return best
+
+
+def _slow_date(value) -> pd.Timestamp:
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            stamp = pd.to_datetime(value, dayfirst=True)
+    except (ValueError, TypeError, OverflowError):
+        return pd.NaT
+    if stamp is not pd.NaT and stamp.tzinfo is not None:
+        stamp = stamp.tz_localize(None)
+    return stamp
+
+
+def parse_dates(series: pd.Series) -> Tuple[pd.Series, int]:
+    """Parse a date column with the dominant explicit format.
+
+    Distinct text values are parsed once; only those the detected format
+    rejects go through the day-first dateutil parser. Returns the parsed
+    series and how many rows took that slow path.
+    """
+    if not (series.dtype == object or pd.api.types.is_string_dtype(series.dtype)):
+        return pd.to_datetime(series, errors="coerce", dayfirst=True), 0
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype=object)
+    is_text = uniques.map(lambda value: isinstance(value, str))
+    text = uniques[is_text].str.strip()
+    text = text[text != ""]
+    if (~is_text).any():
+        parsed[~is_text] = uniques[~is_text].map(_slow_date)
+    fmt = _detect_date_format(text) if not text.empty else None
+    pending = text
+    if fmt is not None:
+        fast = _strict_dates(text, fmt)
+        parsed[fast.index[fast.notna()]] = fast[fast.notna()]
+        pending = text[fast.isna()]
+    slow_rows = 0
+    if not pending.empty:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                slow = pd.to_datetime(pending, format="mixed", dayfirst=True, errors="coerce")
+            if slow.dt.tz is not None:
+                slow = slow.dt.tz_localize(None)
+        except (ValueError, TypeError):
+            slow = pending.map(_slow_date)
+        parsed[pending.index] = slow
+        slow_rows = int(np.isin(codes, pending.index.to_numpy()).sum())
+    lookup = pd.to_datetime(pd.concat([parsed, pd.Series([pd.NaT], dtype=object)], ignore_index=True))
+    result = pd.Series(lookup.to_numpy()[codes], index=series.index, name=series.name)
+    with _DATE_LOCK:
+        _DATE_STATS["filas"] += len(series)
+        _DATE_STATS["lentas"] += slow_rows
+        if fmt is not None:
+            _DATE_STATS["formatos"][fmt] = _DATE_STATS["formatos"].get(fmt, 0) + 1
+    return result, slow_rows
+
+
+def date_parse_stats() -> Dict[str, object]:
+    with _DATE_LOCK:
+        return {**_DATE_STATS, "formatos": dict(_DATE_STATS["formatos"])}
+
+
 def _normalize_dataframe(
     df: pd.DataFrame,
     mapping: Dict[str, str],
     equivalencias: Dict[str, str],
     reglas: Dict[str, str],
+    subtipo_equivalencias: Optional[Dict[str, str]] = None,
+    feriados_settings: Optional[Dict] = None,
 ) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame(columns=EXPECTED_COLUMNS)
@@ -147,28 +575,26 @@ def _normalize_dataframe(
         )
 
     df = df[EXPECTED_COLUMNS]
-    df["sede"] = df["sede"].apply(
-        lambda x: _normalize_sede(x, equivalencias)
-        if pd.notna(x) and str(x).strip()
-        else None
-    )
+    sedes_slug = _slug_keys(equivalencias)
+    df["sede"] = _map_unique(df["sede"], lambda x: _normalize_sede(x, sedes_slug))
 
     for col in ["fecha_inicio", "fecha_termino", "turno_inicio", "turno_fin"]:
-        df[col] = pd.to_datetime(df[col], errors="coerce", dayfirst=True)
+        df[col], _ = parse_dates(df[col])
 
     df["dias"] = pd.to_numeric(df["dias"], errors="coerce")
     df["horas"] = pd.to_numeric(df["horas"], errors="coerce")
 
-    def compute_row_days(row):
-        if pd.notna(row["dias"]):
-            return row["dias"]
-        tipo = _slug(row["tipo_registro"])
-        regla = reglas.get(tipo, "naturales")
-        return metrics.days_between(
-            row["fecha_inicio"], row["fecha_termino"], regla, row.get("horas")
+    faltantes = df["dias"].isna()
+    if faltantes.any():
+        pendientes = df.loc[faltantes]
+        df.loc[faltantes, "dias"] = metrics.days_between_columns(
+            pendientes["fecha_inicio"],
+            pendientes["fecha_termino"],
+            _rules_for(pendientes["tipo_registro"], reglas),
+            pendientes["horas"],
+            calendario=feriados.calendar_for(feriados_settings),
         )
-
-    df["dias"] = df.apply(compute_row_days, axis=1).fillna(0)
+    df["dias"] = df["dias"].fillna(0)
 
     for col in ["fecha_inicio", "fecha_termino"]:
         try:
@@ -176,26 +602,512 @@ def _normalize_dataframe(
         except (TypeError, AttributeError):
             pass
 
-    df["estado"] = df["estado"].fillna("Pendiente").str.title()
-    df["tipo_registro"] = df["tipo_registro"].apply(_title_or_none)
-    df["subtipo"] = df["subtipo"].apply(_title_or_none)
-    return df
+    subtipos_slug = _slug_keys(subtipo_equivalencias)
+    df["estado"] = _map_unique(df["estado"], _normalize_estado)
+    df["tipo_registro"] = _map_unique(df["tipo_registro"], _title_or_none)
+    df["subtipo"] = _map_unique(
+        df["subtipo"], lambda x: _normalize_subtipo(x, subtipos_slug)
+    )
+    return compact_dataset(df)
 
 
-@st.cache_data(show_spinner=False)
-def _cached_load(
-    cache_key: str,
+def _float32_safe(series: pd.Series) -> bool:
+    original = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+    narrowed = original.astype(np.float32).astype(float)
+    return np.array_equal(np.round(narrowed, 2), np.round(original, 2), equal_nan=True)
+
+
+def _with_turno_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the derived turno columns, recomputing them if any row lacks them."""
+    if all(col in df.columns for col in metrics.TURNO_COLUMNS) and df["es_nocturno"].dtype == bool:
+        return df
+    return df.assign(**metrics.turno_columns(df))
+
+
+def compact_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """Dictionary-encode repeated text columns and downcast day/hour counts.
+
+    Staff-only rows (without ``tipo_registro``) are moved first so that
+    :func:`events_view` can return the events as a zero-copy slice. The
+    turno columns of :data:`metrics.TURNO_COLUMNS` are derived here once.
+    """
+    if df.empty:
+        return df
+    df = _with_turno_columns(df)
+    has_tipo = df["tipo_registro"].notna().to_numpy()
+    if (np.diff(has_tipo.astype(np.int8)) < 0).any():
+        df = df.take(np.argsort(has_tipo, kind="stable"))
+    converted = {}
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            converted[column] = df[column].astype("category")
+    for column in FLOAT32_COLUMNS:
+        if column in df.columns and df[column].dtype != np.float32 and _float32_safe(df[column]):
+            converted[column] = pd.to_numeric(df[column], errors="coerce").astype(np.float32)
+    return df.assign(**converted) if converted else df
+
+
+def events_view(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """Return the rows with ``tipo_registro``, as a slice when the frame is compact."""
+    if df is None or df.empty:
+        return df
+    has_tipo = df["tipo_registro"].notna().to_numpy()
+    first = int(np.argmax(has_tipo)) if has_tipo.any() else len(has_tipo)
+    if has_tipo[first:].all():
+        return df.iloc[first:]
+    return df[has_tipo]
+
+
+def update_record(df: pd.DataFrame, index, values: Dict) -> None:
+    """Assign ``values`` to row ``index`` in place, widening categories if needed."""
+    for column, value in values.items():
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            if pd.notna(value) and value not in series.cat.categories:
+                df[column] = series.cat.add_categories([value])
+        elif series.dtype == np.float32 and value is not None:
+            value = np.float32(value)
+        df.loc[index, column] = value
+    if metrics.TURNO_SOURCES.intersection(values) and "es_nocturno" in df.columns:
+        for column, derived in metrics.turno_columns(df.loc[[index]]).items():
+            df.loc[index, column] = derived.iloc[0]
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Bytes used by each column of ``df`` (deep, including string payloads)."""
+    usage = df.memory_usage(index=True, deep=True)
+    dtypes = {"Index": str(df.index.dtype), **{col: str(dtype) for col, dtype in df.dtypes.items()}}
+    report = pd.DataFrame(
+        {
+            "columna": usage.index,
+            "dtype": [dtypes.get(col, "") for col in usage.index],
+            "bytes": usage.to_numpy(dtype="int64"),
+        }
+    )
+    return report.sort_values("bytes", ascending=False, ignore_index=True)
+
+
+def _column_buffers(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    buffers: Dict[str, np.ndarray] = {}
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            buffers[column] = series.array.codes
+        elif isinstance(series.dtype, np.dtype):
+            buffers[column] = series.to_numpy(copy=False)
+    return buffers
+
+
+def session_footprint(state) -> pd.DataFrame:
+    """Bytes held by each DataFrame/bytes entry of a session state mapping.
+
+    Frames that are views over an already counted frame (e.g. ``events_df``)
+    are reported with ``compartido=True`` and excluded from the total.
+    """
+    rows = []
+    seen: list = []
+    for key, value in state.items():
+        if isinstance(value, pd.DataFrame):
+            buffers = _column_buffers(value)
+            shared = any(
+                column in other and np.may_share_memory(array, other[column])
+                for other in seen
+                for column, array in buffers.items()
+            )
+            seen.append(buffers)
+            size = int(value.memory_usage(index=True, deep=True).sum())
+        elif isinstance(value, (bytes, bytearray)):
+            shared, size = False, len(value)
+        else:
+            continue
+        rows.append({"clave": str(key), "bytes": size, "compartido": shared})
+    report = pd.DataFrame(rows, columns=["clave", "bytes", "compartido"])
+    total = int(report.loc[~report["compartido"].astype(bool), "bytes"].sum())
+    total_row = pd.DataFrame([{"clave": "TOTAL", "bytes": total, "compartido": False}])
+    return pd.concat([report, total_row], ignore_index=True)
+
+
+SIDECAR_META_KEY = b"crenal_sidecar_key"
+# Bump whenever the columns, dtypes or row order produced by
+# _normalize_dataframe/compact_dataset change, so stale sidecars are rebuilt.
+SIDECAR_SCHEMA_VERSION = 2
+_SIDECAR_LOCK = threading.Lock()
+_SIDECAR_PENDING: set = set()
+_SIDECAR_STATS = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+
+def _sidecar_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.parquet")
+
+
+def _config_digest(
+    mapping: Dict[str, str],
+    equivalencias: Dict[str, str],
+    reglas: Dict[str, str],
+    subtipo_equivalencias: Optional[Dict[str, str]] = None,
+    feriados_settings: Optional[Dict] = None,
+) -> str:
+    config = json.dumps(
+        {
+            "mapping": mapping,
+            "equivalencias": equivalencias,
+            "reglas": reglas,
+            "subtipos": subtipo_equivalencias or {},
+            "feriados": feriados.calendar_for(feriados_settings).digest,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(config.encode("utf-8")).hexdigest()[:16]
+
+
+def _sidecar_key(
+    path: Path,
+    mapping: Dict[str, str],
+    equivalencias: Dict[str, str],
+    reglas: Dict[str, str],
+    subtipo_equivalencias: Optional[Dict[str, str]] = None,
+    feriados_settings: Optional[Dict] = None,
+) -> str:
+    stat = path.stat()
+    digest = _config_digest(mapping, equivalencias, reglas, subtipo_equivalencias, feriados_settings)
+    return f"v{SIDECAR_SCHEMA_VERSION}:{stat.st_mtime_ns}:{stat.st_size}:{digest}"
+
+
+def _count_sidecar(event: str) -> None:
+    with _SIDECAR_LOCK:
+        _SIDECAR_STATS[event] += 1
+
+
+def sidecar_stats() -> Dict[str, int]:
+    """Return hit/miss/write counters of the Parquet sidecar cache."""
+    with _SIDECAR_LOCK:
+        return dict(_SIDECAR_STATS)
+
+
+def _read_sidecar(path: Path, key: str) -> Optional[pd.DataFrame]:
+    sidecar = _sidecar_path(path)
+    if not HAS_PARQUET or not sidecar.exists():
+        _count_sidecar("misses")
+        return None
+    try:
+        metadata = pq.read_schema(sidecar).metadata or {}
+        if metadata.get(SIDECAR_META_KEY) != key.encode("utf-8"):
+            _count_sidecar("misses")
+            return None
+        frame = pq.read_table(sidecar).to_pandas()
+    except Exception:
+        _count_sidecar("errors")
+        return None
+    _count_sidecar("hits")
+    return frame
+
+
+def _write_sidecar(path: Path, key: str, frame: pd.DataFrame) -> None:
+    sidecar = _sidecar_path(path)
+    tmp_path = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+    try:
+        table = pa.Table.from_pandas(frame, preserve_index=True)
+        metadata = dict(table.schema.metadata or {})
+        metadata[SIDECAR_META_KEY] = key.encode("utf-8")
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+        os.replace(tmp_path, sidecar)
+        _count_sidecar("writes")
+    except Exception:
+        _count_sidecar("errors")
+        tmp_path.unlink(missing_ok=True)
+    finally:
+        with _SIDECAR_LOCK:
+            _SIDECAR_PENDING.discard(key)
+
+
+def _schedule_sidecar(path: Path, key: str, frame: pd.DataFrame) -> None:
+    """Rebuild the sidecar in a background thread so the caller is not blocked."""
+    if not HAS_PARQUET:
+        return
+    with _SIDECAR_LOCK:
+        if key in _SIDECAR_PENDING:
+            return
+        _SIDECAR_PENDING.add(key)
+    threading.Thread(
+        target=_write_sidecar,
+        args=(path, key, frame),
+        name="crenal-sidecar",
+        daemon=True,
+    ).start()
+
+
+JOURNAL_COMPACT_EVERY = 200
+_JOURNAL_LOCK = threading.RLock()
+_JOURNAL_NEXT_ID: Dict[str, int] = {}
+_JOURNAL_COMPACTING: set = set()
+_JOURNAL_FAILURES: Dict[str, Tuple[str, str]] = {}
+
+
+def _journal_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.journal.jsonl")
+
+
+def source_version(path: Union[str, Path]) -> str:
+    """Version token of a workbook plus its pending journal."""
+    path = Path(path)
+    if not path.exists():
+        return "missing"
+    journal = _journal_path(path)
+    pending = journal.stat() if journal.exists() else None
+    journal_token = f"{pending.st_mtime_ns}:{pending.st_size}" if pending else "0"
+    return f"{path.stat().st_mtime_ns}::{journal_token}"
+
+
+def _json_value(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _append_journal(path: Path, record: Dict) -> None:
+    record = {"ts": datetime.now().isoformat(timespec="seconds"), **record}
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _JOURNAL_LOCK:
+        with _journal_path(path).open("a", encoding="utf-8") as fh:
+            fh.write(line)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+
+def _journal_row(row: Dict) -> Dict:
+    return {column: _json_value(row.get(column)) for column in EXPECTED_COLUMNS}
+
+
+def _with_record_ids(frame: pd.DataFrame) -> pd.DataFrame:
+    """Index the rows by the stored ``registro_id`` column when the sheet has one.
+
+    Journal records point at these ids, so they must survive compaction
+    reordering the sheet. Rows without a valid id, or repeating one, get
+    fresh ids after the highest stored id; sheets without the column keep
+    their row positions until the next compaction writes them.
+    """
+    if ID_COLUMN not in frame.columns:
+        return frame
+    ids = pd.to_numeric(frame[ID_COLUMN], errors="coerce")
+    invalid = ids.isna() | (ids < 0) | (ids != ids.round()) | ids.duplicated()
+    if invalid.any():
+        start = int(ids[~invalid].max()) + 1 if (~invalid).any() else 0
+        ids[invalid] = np.arange(start, start + int(invalid.sum()))
+    return frame.drop(columns=ID_COLUMN).set_axis(pd.Index(ids.astype(np.int64)), axis=0)
+
+
+def next_record_id(path: Union[str, Path], df: pd.DataFrame) -> int:
+    """Reserve a row label for a new record, unique across sessions of this process."""
+    key = str(Path(path).resolve())
+    with _JOURNAL_LOCK:
+        current = int(df.index.max()) + 1 if len(df.index) else 0
+        label = max(current, _JOURNAL_NEXT_ID.get(key, 0))
+        _JOURNAL_NEXT_ID[key] = label + 1
+    return label
+
+
+def journal_insert(path: Union[str, Path], label: int, row: Dict) -> None:
+    _append_journal(Path(path), {"op": "insert", "id": int(label), "row": _journal_row(row)})
+
+
+def journal_update(path: Union[str, Path], label: int, row: Dict) -> None:
+    _append_journal(Path(path), {"op": "update", "id": int(label), "row": _journal_row(row)})
+
+
+def journal_delete(path: Union[str, Path], label: int) -> None:
+    _append_journal(Path(path), {"op": "delete", "id": int(label)})
+
+
+def read_journal(path: Union[str, Path]) -> list:
+    journal = _journal_path(Path(path))
+    if not journal.exists():
+        return []
+    records = []
+    with journal.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def _replay_journal(
+    df: pd.DataFrame,
+    records: list,
+    mapping: Dict[str, str],
+    equivalencias: Dict[str, str],
+    reglas: Dict[str, str],
+    subtipo_equivalencias: Optional[Dict[str, str]] = None,
+    feriados_settings: Optional[Dict] = None,
+) -> pd.DataFrame:
+    upserts: Dict[int, Dict] = {}
+    deleted: set = set()
+    for record in records:
+        label = record.get("id")
+        if label is None:
+            continue
+        if record.get("op") == "delete":
+            upserts.pop(label, None)
+            deleted.add(label)
+        elif record.get("row") is not None:
+            upserts[label] = record["row"]
+            deleted.discard(label)
+    replaced = df.index.intersection(list(deleted | set(upserts)))
+    merged = df.drop(index=replaced) if len(replaced) else df
+    if upserts:
+        rows = pd.DataFrame(list(upserts.values()), index=list(upserts.keys()))
+        for column in ["fecha_inicio", "fecha_termino", "turno_inicio", "turno_fin"]:
+            if column in rows.columns:
+                rows[column] = pd.to_datetime(rows[column], errors="coerce", format="ISO8601")
+        rows = _normalize_dataframe(
+            rows, mapping, equivalencias, reglas, subtipo_equivalencias, feriados_settings
+        )
+        merged = pd.concat([merged, rows])
+    return compact_dataset(merged.sort_index())
+
+
+def _load_source(
     path_str: Optional[str],
     payload: Optional[bytes],
     mapping: Dict[str, str],
     equivalencias: Dict[str, str],
     reglas: Dict[str, str],
+    subtipo_equivalencias: Optional[Dict[str, str]] = None,
+    feriados_settings: Optional[Dict] = None,
 ) -> pd.DataFrame:
-    _ = cache_key
+    sidecar_key = None
+    if payload is None and path_str:
+        path = Path(path_str)
+        sidecar_key = _sidecar_key(
+            path, mapping, equivalencias, reglas, subtipo_equivalencias, feriados_settings
+        )
+        cached = _read_sidecar(path, sidecar_key)
+        if cached is not None:
+            return cached
     source = io.BytesIO(payload) if payload is not None else path_str
     handle, ext = _ensure_buffer(source)
-    frame = _read_df(handle, ext)
-    return _normalize_dataframe(frame, mapping, equivalencias, reglas)
+    frame = _with_record_ids(_read_df(handle, ext))
+    normalized = _normalize_dataframe(
+        frame, mapping, equivalencias, reglas, subtipo_equivalencias, feriados_settings
+    )
+    if sidecar_key is not None:
+        _schedule_sidecar(Path(path_str), sidecar_key, normalized)
+    return normalized
+
+
+def compact_journal(
+    path: Union[str, Path],
+    mapping: Dict[str, str],
+    equivalencias: Dict[str, str],
+    reglas: Dict[str, str],
+    subtipo_equivalencias: Optional[Dict[str, str]] = None,
+    feriados_settings: Optional[Dict] = None,
+) -> int:
+    """Fold the pending journal into the workbook and return how many records it held.
+
+    Rows keep their ids in the ``registro_id`` column, so records journaled
+    by sessions loaded before the compaction still reach the right rows. A
+    failure is remembered for :func:`compaction_error` and re-raised.
+    """
+    path = Path(path)
+    with _JOURNAL_LOCK:
+        records = read_journal(path)
+        if not records:
+            _JOURNAL_FAILURES.pop(str(path), None)
+            return 0
+        try:
+            base = _load_source(
+                str(path), None, mapping, equivalencias, reglas, subtipo_equivalencias, feriados_settings
+            )
+            merged = _replay_journal(
+                base, records, mapping, equivalencias, reglas, subtipo_equivalencias, feriados_settings
+            )
+            save_dataset(merged, path)
+            _journal_path(path).unlink(missing_ok=True)
+        except Exception as exc:
+            _JOURNAL_FAILURES[str(path)] = (source_version(path), str(exc) or type(exc).__name__)
+            raise
+        _JOURNAL_FAILURES.pop(str(path), None)
+    return len(records)
+
+
+def compaction_error(path: Union[str, Path]) -> Optional[str]:
+    """Message of the last failed compaction of ``path``, if it has not succeeded since."""
+    with _JOURNAL_LOCK:
+        failure = _JOURNAL_FAILURES.get(str(Path(path)))
+    return failure[1] if failure else None
+
+
+def _compact_in_background(path: Path, *config) -> None:
+    try:
+        compact_journal(path, *config)
+    except Exception:
+        LOGGER.exception("No se pudo consolidar el diario de %s", path)
+    finally:
+        with _JOURNAL_LOCK:
+            _JOURNAL_COMPACTING.discard(str(path))
+
+
+def _schedule_compaction(path: Path, *config) -> None:
+    """Compact in a background thread, unless it already failed on this same journal."""
+    with _JOURNAL_LOCK:
+        failure = _JOURNAL_FAILURES.get(str(path))
+        if str(path) in _JOURNAL_COMPACTING or (failure and failure[0] == source_version(path)):
+            return
+        _JOURNAL_COMPACTING.add(str(path))
+    threading.Thread(
+        target=_compact_in_background,
+        args=(path, *config),
+        name="crenal-journal",
+        daemon=True,
+    ).start()
+
+
+LOAD_CACHE = BoundedCache(
+    max_bytes=int(os.environ.get("CRENAL_LOAD_CACHE_MB", "256")) * 1024 * 1024,
+    ttl=float(os.environ.get("CRENAL_LOAD_CACHE_TTL", "0")) or None,
+)
+
+
+def load_cache_stats() -> Dict[str, float]:
+    """Hit/miss/eviction counters and byte usage of the dataset cache."""
+    return LOAD_CACHE.stats()
+
+
+def _cached_load(
+    cache_key: str,
+    path_str: Optional[str],
+    payload: Optional[bytes],
+    mapping: Dict[str, str],
+    equivalencias: Dict[str, str],
+    reglas: Dict[str, str],
+    subtipo_equivalencias: Optional[Dict[str, str]] = None,
+    feriados_settings: Optional[Dict] = None,
+) -> pd.DataFrame:
+    config = (mapping, equivalencias, reglas, subtipo_equivalencias, feriados_settings)
+
+    def compute() -> pd.DataFrame:
+        frame = _load_source(path_str, payload, *config)
+        if payload is None and path_str:
+            records = read_journal(path_str)
+            if records:
+                frame = _replay_journal(frame, records, *config)
+            if len(records) >= JOURNAL_COMPACT_EVERY:
+                _schedule_compaction(Path(path_str), *config)
+        return frame
+
+    key = f"{cache_key}::{_config_digest(*config)}"
+    return detach(LOAD_CACHE.get_or_compute(key, compute))
 
 
 def load_data(
@@ -203,15 +1115,18 @@ def load_data(
     mapping: Dict[str, str],
     equivalencias: Dict[str, str],
     reglas: Dict[str, str],
+    subtipo_equivalencias: Optional[Dict[str, str]] = None,
+    feriados_settings: Optional[Dict] = None,
 ) -> pd.DataFrame:
+    config = (mapping, equivalencias, reglas, subtipo_equivalencias, feriados_settings)
     try:
         if isinstance(source, (str, Path)):
             path = Path(source)
-            cache_key = f"path::{path.resolve()}::{path.stat().st_mtime}"
-            return _cached_load(cache_key, str(path), None, mapping, equivalencias, reglas)
+            cache_key = f"path::{path.resolve()}::{source_version(path)}"
+            return _cached_load(cache_key, str(path), None, *config)
         data_bytes = source if isinstance(source, bytes) else source.getvalue()
-        cache_key = f"upload::{hash(data_bytes)}"
-        return _cached_load(cache_key, None, data_bytes, mapping, equivalencias, reglas)
+        cache_key = f"upload::{hashlib.sha256(data_bytes).hexdigest()}"
+        return _cached_load(cache_key, None, data_bytes, *config)
     except ValueError:
         raise
     except Exception as exc:
@@ -220,13 +1135,189 @@ def load_data(
         ) from exc
 
 
+INGEST_SUFFIXES = {".xlsx", ".xls", ".xlsm", ".csv", ".parquet"}
+_INGEST_LOCK = threading.Lock()
+_INGEST_POOL: Optional[ProcessPoolExecutor] = None
+_INGEST_WORKERS = 0
+
+
+def _ingest_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool shared by every :func:`load_many` call, grown on demand."""
+    global _INGEST_POOL, _INGEST_WORKERS
+    with _INGEST_LOCK:
+        if _INGEST_POOL is None or _INGEST_WORKERS < workers:
+            if _INGEST_POOL is not None:
+                _INGEST_POOL.shutdown(wait=False)
+            _INGEST_POOL = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            _INGEST_WORKERS = workers
+        return _INGEST_POOL
+
+
+def _reset_ingest_pool(pool: ProcessPoolExecutor) -> None:
+    global _INGEST_POOL, _INGEST_WORKERS
+    with _INGEST_LOCK:
+        if _INGEST_POOL is pool:
+            _INGEST_POOL, _INGEST_WORKERS = None, 0
+    pool.shutdown(wait=False)
+
+
+def _stats_snapshot() -> Dict[str, Dict]:
+    return {"sidecar": sidecar_stats(), "fechas": date_parse_stats()}
+
+
+def _stats_delta(before: Dict[str, Dict], after: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Counters added between two :func:`_stats_snapshot` calls."""
+    formatos_antes = before["fechas"]["formatos"]
+    return {
+        "sidecar": {name: after["sidecar"][name] - before["sidecar"][name] for name in after["sidecar"]},
+        "fechas": {
+            "filas": after["fechas"]["filas"] - before["fechas"]["filas"],
+            "lentas": after["fechas"]["lentas"] - before["fechas"]["lentas"],
+            "formatos": {
+                fmt: count - formatos_antes.get(fmt, 0)
+                for fmt, count in after["fechas"]["formatos"].items()
+                if count != formatos_antes.get(fmt, 0)
+            },
+        },
+    }
+
+
+def _merge_stats(delta: Dict[str, Dict]) -> None:
+    """Fold counters reported by a worker process into this process' totals."""
+    with _SIDECAR_LOCK:
+        for name, count in delta["sidecar"].items():
+            _SIDECAR_STATS[name] += count
+    with _DATE_LOCK:
+        _DATE_STATS["filas"] += delta["fechas"]["filas"]
+        _DATE_STATS["lentas"] += delta["fechas"]["lentas"]
+        for fmt, count in delta["fechas"]["formatos"].items():
+            _DATE_STATS["formatos"][fmt] = _DATE_STATS["formatos"].get(fmt, 0) + count
+
+
+def _ingest_file(
+    path_str: str, config: Tuple
+) -> Tuple[Optional[pd.DataFrame], float, Optional[str], Dict[str, Dict]]:
+    """Parse and normalize one file inside a worker process (sidecar-aware).
+
+    Also returns the sidecar and date counters the file added, since the
+    worker's own totals never reach the parent process.
+    """
+    started = time.perf_counter()
+    before = _stats_snapshot()
+    try:
+        path = Path(path_str)
+        key = _sidecar_key(path, *config)
+        frame = _read_sidecar(path, key)
+        if frame is None:
+            if path.suffix.lower() in {".xlsx", ".xls", ".xlsm"}:
+                raw = _data_sheet(_parse_workbook(path_str))
+            else:
+                raw = _read_df(path, path.suffix.lower())
+            frame = _normalize_dataframe(raw, *config)
+            if HAS_PARQUET:
+                _write_sidecar(path, key, frame)
+        return frame, time.perf_counter() - started, None, _stats_delta(before, _stats_snapshot())
+    except Exception as exc:
+        return None, time.perf_counter() - started, str(exc), _stats_delta(before, _stats_snapshot())
+
+
+def _reconcile(frames: list) -> pd.DataFrame:
+    """Concatenate normalized chunks whose dtypes and categories may differ."""
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=EXPECTED_COLUMNS)
+    aligned = []
+    for frame in frames:
+        frame = frame.reindex(columns=EXPECTED_COLUMNS)
+        aligned.append(frame.astype({col: object for col in CATEGORY_COLUMNS}))
+    merged = pd.concat(aligned, ignore_index=True)
+    for column in DATE_COLUMNS:
+        merged[column] = pd.to_datetime(merged[column], errors="coerce")
+    for column in FLOAT32_COLUMNS:
+        merged[column] = pd.to_numeric(merged[column], errors="coerce")
+    return compact_dataset(merged)
+
+
+def list_ingest_files(directory: Union[str, Path]) -> List[Path]:
+    """Data files of a folder of exports, skipping hidden and Office lock files."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    return sorted(
+        item
+        for item in directory.iterdir()
+        if item.is_file()
+        and item.suffix.lower() in INGEST_SUFFIXES
+        and not item.name.startswith((".", "~$"))
+    )
+
+
+def load_many(
+    sources: Iterable[Union[str, Path]],
+    mapping: Dict[str, str],
+    equivalencias: Dict[str, str],
+    reglas: Dict[str, str],
+    subtipo_equivalencias: Optional[Dict[str, str]] = None,
+    feriados_settings: Optional[Dict] = None,
+    max_workers: Optional[int] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Ingest several files concurrently and return ``(dataset, report)``.
+
+    Files are parsed and normalized in a process pool reused across calls;
+    the report lists ``archivo``, ``registros``, ``segundos`` and ``error``
+    per file.
+    """
+    paths = [Path(source) for source in sources]
+    config = (mapping, equivalencias, reglas, subtipo_equivalencias, feriados_settings)
+    versions = "|".join(f"{path.resolve()}::{workbook_version(path)}" for path in paths)
+    key = f"many::{hashlib.sha256(versions.encode('utf-8')).hexdigest()}::{_config_digest(*config)}"
+
+    def compute() -> Tuple[pd.DataFrame, pd.DataFrame]:
+        if len(paths) <= 1:
+            results = [_ingest_file(str(path), config) for path in paths]
+        else:
+            workers = max_workers or min(len(paths), os.cpu_count() or 1)
+            args = ([str(path) for path in paths], [config] * len(paths))
+            pool = _ingest_pool(workers)
+            try:
+                results = list(pool.map(_ingest_file, *args))
+            except BrokenProcessPool:
+                _reset_ingest_pool(pool)
+                results = list(_ingest_pool(workers).map(_ingest_file, *args))
+            for result in results:
+                _merge_stats(result[3])
+        report = pd.DataFrame(
+            [
+                {
+                    "archivo": path.name,
+                    "registros": 0 if frame is None else len(frame),
+                    "segundos": round(elapsed, 3),
+                    "error": error,
+                }
+                for path, (frame, elapsed, error, _) in zip(paths, results)
+            ],
+            columns=["archivo", "registros", "segundos", "error"],
+        )
+        return _reconcile([result[0] for result in results]), report
+
+    dataset, report = LOAD_CACHE.get_or_compute(key, compute)
+    return detach(dataset), report.copy()
+
+
 def load_catalogs(base_path: Union[str, Path]) -> Dict[str, Union[list, Dict[str, list]]]:
     base_path = Path(base_path)
     if not base_path.exists():
         return {}
-    try:
-        tipos_df = pd.read_excel(base_path, sheet_name="Tipos")
-    except ValueError:
+    tipos_df = read_workbook(base_path).get("Tipos")
+    if tipos_df is None:
+        return {}
+    return _catalogs_from_frame(tipos_df)
+
+
+def _catalogs_from_frame(tipos_df: pd.DataFrame) -> Dict[str, Union[list, Dict[str, list]]]:
+    if tipos_df.empty:
         return {}
     catalogos: Dict[str, Union[list, Dict[str, list]]] = {}
     catalogos["tipos"] = sorted(
@@ -259,15 +1350,11 @@ def load_staff(base_path: Union[str, Path]) -> pd.DataFrame:
     base_path = Path(base_path)
     if not base_path.exists():
         return pd.DataFrame(columns=["rut", "nombre", "cargo", "sede"])
-    try:
-        staff = pd.read_excel(
-            base_path,
-            sheet_name="BBDD",
-            usecols=["rut", "nombre", "cargo", "sede"],
-        )
-    except ValueError:
-        return pd.DataFrame(columns=["rut", "nombre", "cargo", "sede"])
-    return staff.dropna(subset=["rut", "nombre"]).drop_duplicates()
+    columns = ["rut", "nombre", "cargo", "sede"]
+    bbdd = read_workbook(base_path).get("BBDD")
+    if bbdd is None or not set(columns).issubset(bbdd.columns):
+        return pd.DataFrame(columns=columns)
+    return bbdd[columns].dropna(subset=["rut", "nombre"]).drop_duplicates()
 
 
 def save_dataset(df: pd.DataFrame, base_path: Union[str, Path]) -> None:
@@ -277,8 +1364,304 @@ def save_dataset(df: pd.DataFrame, base_path: Union[str, Path]) -> None:
         if column not in df_out.columns:
             df_out[column] = None
     df_out = df_out[EXPECTED_COLUMNS]
+    df_out[ID_COLUMN] = df.index.to_numpy()
     writer_kwargs = {"engine": "openpyxl"}
     if base_path.exists():
         writer_kwargs.update({"mode": "a", "if_sheet_exists": "replace"})
     with pd.ExcelWriter(base_path, **writer_kwargs) as writer:
         df_out.to_excel(writer, sheet_name="BBDD", index=False)
+
+
+CATALOG_COLUMNS = ["tipo_registro", "subtipo", "estado", "sede", "cargo"]
+DATE_COLUMNS = ["fecha_inicio", "fecha_termino", "turno_inicio", "turno_fin"]
+SQL_DATE_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+class StorageBackend(ABC):
+    """Where the normalized events and the ``Tipos`` catalog live."""
+
+    compactable = False
+
+    @abstractmethod
+    def exists(self) -> bool: ...
+
+    @abstractmethod
+    def version(self) -> str: ...
+
+    @abstractmethod
+    def load_events(self) -> pd.DataFrame: ...
+
+    @abstractmethod
+    def load_catalog(self) -> pd.DataFrame: ...
+
+    def load_catalogs(self) -> Dict[str, Union[list, Dict[str, list]]]:
+        return _catalogs_from_frame(self.load_catalog())
+
+    @abstractmethod
+    def next_id(self, df: pd.DataFrame) -> int: ...
+
+    @abstractmethod
+    def insert(self, label: int, row: Dict) -> None: ...
+
+    @abstractmethod
+    def update(self, label: int, row: Dict) -> None: ...
+
+    @abstractmethod
+    def delete(self, label: int) -> None: ...
+
+    def pending_changes(self) -> int:
+        return 0
+
+    def compaction_error(self) -> Optional[str]:
+        return None
+
+    def compact(self) -> int:
+        return 0
+
+
+class ExcelBackend(StorageBackend):
+    """The historical layout: ``BBDD``/``Tipos`` sheets plus the write journal."""
+
+    compactable = True
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        mapping: Dict[str, str],
+        equivalencias: Dict[str, str],
+        reglas: Dict[str, str],
+        subtipo_equivalencias: Optional[Dict[str, str]] = None,
+        feriados_settings: Optional[Dict] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.config = (mapping, equivalencias, reglas, subtipo_equivalencias, feriados_settings)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def version(self) -> str:
+        return source_version(self.path)
+
+    def load_events(self) -> pd.DataFrame:
+        return load_data(self.path, *self.config)
+
+    def load_catalog(self) -> pd.DataFrame:
+        if not self.path.exists():
+            return pd.DataFrame(columns=CATALOG_COLUMNS)
+        tipos = read_workbook(self.path).get("Tipos")
+        return tipos if tipos is not None else pd.DataFrame(columns=CATALOG_COLUMNS)
+
+    def next_id(self, df: pd.DataFrame) -> int:
+        return next_record_id(self.path, df)
+
+    def insert(self, label: int, row: Dict) -> None:
+        journal_insert(self.path, label, row)
+
+    def update(self, label: int, row: Dict) -> None:
+        journal_update(self.path, label, row)
+
+    def delete(self, label: int) -> None:
+        journal_delete(self.path, label)
+
+    def pending_changes(self) -> int:
+        return len(read_journal(self.path))
+
+    def compaction_error(self) -> Optional[str]:
+        return compaction_error(self.path)
+
+    def compact(self) -> int:
+        return compact_journal(self.path, *self.config)
+
+
+def _sql_frame(df: pd.DataFrame) -> pd.DataFrame:
+    out = {}
+    for column in EXPECTED_COLUMNS:
+        values = df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if column in DATE_COLUMNS:
+            values = pd.to_datetime(values, errors="coerce").dt.strftime(SQL_DATE_FMT)
+        elif column in ("dias", "horas"):
+            values = pd.to_numeric(values, errors="coerce").astype(float)
+        else:
+            values = values.astype(str).where(values.notna())
+        out[column] = values.astype(object).where(values.notna(), None)
+    return pd.DataFrame(out, index=df.index)
+
+
+def _read_sqlite(db_path: str) -> pd.DataFrame:
+    with sqlite3.connect(db_path) as conn:
+        frame = pd.read_sql_query(
+            "SELECT * FROM eventos ORDER BY row_id", conn, index_col="row_id"
+        )
+    return _events_from_sql(frame)
+
+
+def _events_from_sql(frame: pd.DataFrame) -> pd.DataFrame:
+    frame.index.name = None
+    for column in DATE_COLUMNS:
+        frame[column] = pd.to_datetime(frame[column], errors="coerce", format=SQL_DATE_FMT)
+    return compact_dataset(frame[EXPECTED_COLUMNS])
+
+
+class SQLiteBackend(StorageBackend):
+    """Events and catalog in an embedded SQLite file with indexed lookups."""
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS eventos (row_id INTEGER PRIMARY KEY, "
+        + ", ".join(
+            f"{col} {'REAL' if col in ('dias', 'horas') else 'TEXT'}" for col in EXPECTED_COLUMNS
+        )
+        + ")",
+        "CREATE TABLE IF NOT EXISTS tipos ("
+        + ", ".join(f"{col} TEXT" for col in CATALOG_COLUMNS)
+        + ")",
+        "CREATE INDEX IF NOT EXISTS idx_eventos_rut ON eventos (rut)",
+        "CREATE INDEX IF NOT EXISTS idx_eventos_sede ON eventos (sede)",
+        "CREATE INDEX IF NOT EXISTS idx_eventos_tipo ON eventos (tipo_registro)",
+        "CREATE INDEX IF NOT EXISTS idx_eventos_fecha ON eventos (fecha_inicio)",
+    ]
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path))
+        try:
+            with conn:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+                yield conn
+        finally:
+            conn.close()
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def version(self) -> str:
+        if not self.path.exists():
+            return "missing"
+        stat = self.path.stat()
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def load_events(self) -> pd.DataFrame:
+        if not self.exists():
+            return pd.DataFrame(columns=EXPECTED_COLUMNS)
+        db_path = str(self.path)
+        key = ("sqlite", db_path, self.version())
+        return detach(LOAD_CACHE.get_or_compute(key, lambda: _read_sqlite(db_path)))
+
+    def load_catalog(self) -> pd.DataFrame:
+        with self._connect() as conn:
+            return pd.read_sql_query("SELECT * FROM tipos", conn)
+
+    def next_id(self, df: pd.DataFrame) -> int:
+        with self._connect() as conn:
+            (stored,) = conn.execute("SELECT COALESCE(MAX(row_id), -1) + 1 FROM eventos").fetchone()
+        current = int(df.index.max()) + 1 if len(df.index) else 0
+        return max(int(stored), current)
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, rows: pd.DataFrame) -> None:
+        values = _sql_frame(rows)
+        columns = ", ".join(["row_id", *EXPECTED_COLUMNS])
+        marks = ", ".join("?" * (len(EXPECTED_COLUMNS) + 1))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO eventos ({columns}) VALUES ({marks})",
+            [(int(label), *record) for label, record in zip(values.index, values.itertuples(index=False))],
+        )
+
+    def insert(self, label: int, row: Dict) -> None:
+        with self._connect() as conn:
+            self._upsert(conn, pd.DataFrame([row], index=[label]))
+
+    def update(self, label: int, row: Dict) -> None:
+        self.insert(label, row)
+
+    def delete(self, label: int) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM eventos WHERE row_id = ?", (int(label),))
+
+    def write(self, events: pd.DataFrame, catalog: Optional[pd.DataFrame] = None) -> None:
+        """Replace the stored events (and catalog when given)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM eventos")
+            if catalog is not None:
+                conn.execute("DELETE FROM tipos")
+                tabla = catalog.reindex(columns=CATALOG_COLUMNS).astype(object)
+                conn.executemany(
+                    f"INSERT INTO tipos VALUES ({', '.join('?' * len(CATALOG_COLUMNS))})",
+                    tabla.where(tabla.notna(), None).itertuples(index=False),
+                )
+            self._upsert(conn, events)
+
+    def import_xlsx(
+        self,
+        xlsx_path: Union[str, Path],
+        mapping: Dict[str, str],
+        equivalencias: Dict[str, str],
+        reglas: Dict[str, str],
+        subtipo_equivalencias: Optional[Dict[str, str]] = None,
+        feriados_settings: Optional[Dict] = None,
+    ) -> int:
+        """Load the workbook (journal included) into the database; return the row count."""
+        excel = ExcelBackend(
+            xlsx_path, mapping, equivalencias, reglas, subtipo_equivalencias, feriados_settings
+        )
+        config = excel.config
+        events = _load_source(str(excel.path), None, *config)
+        records = read_journal(excel.path)
+        if records:
+            events = _replay_journal(events, records, *config)
+        self.write(events, excel.load_catalog())
+        return len(events)
+
+    def export_xlsx(self, xlsx_path: Union[str, Path]) -> None:
+        """Write the ``BBDD`` and ``Tipos`` sheets in the current workbook layout.
+
+        Other sheets of an existing workbook are kept.
+        """
+        xlsx_path = Path(xlsx_path)
+        events = self.load_events().reindex(columns=EXPECTED_COLUMNS)
+        events[ID_COLUMN] = events.index.to_numpy()
+        writer_kwargs = {"engine": "openpyxl"}
+        if xlsx_path.exists():
+            writer_kwargs.update({"mode": "a", "if_sheet_exists": "replace"})
+        with pd.ExcelWriter(xlsx_path, **writer_kwargs) as writer:
+            events.to_excel(writer, sheet_name="BBDD", index=False)
+            self.load_catalog().to_excel(writer, sheet_name="Tipos", index=False)
+
+
+def dataset_settings(config: Dict, mapping: Dict[str, str]) -> Tuple:
+    """The ``(mapping, equivalencias, reglas, subtipos, feriados)`` a load normalizes with."""
+    return (
+        mapping,
+        config.get("sede_equivalencias", {}),
+        config.get("reglas_dias", {}),
+        config.get("subtipo_equivalencias", {}),
+        config.get("feriados", {}),
+    )
+
+
+def settings_digest(config: Dict, mapping: Dict[str, str]) -> str:
+    """Short digest of :func:`dataset_settings`; changes whenever a reload is due."""
+    return _config_digest(*dataset_settings(config, mapping))
+
+
+def get_backend(
+    config: Dict,
+    base_path: Union[str, Path],
+    mapping: Dict[str, str],
+    root: Optional[Union[str, Path]] = None,
+) -> StorageBackend:
+    """Build the storage backend selected under ``storage`` in ``config.yaml``."""
+    storage = config.get("storage") or {}
+    settings = dataset_settings(config, mapping)
+    if storage.get("backend") != "sqlite":
+        return ExcelBackend(base_path, *settings)
+    db_path = Path(storage.get("sqlite_path") or Path(base_path).with_suffix(".sqlite"))
+    if root is not None and not db_path.is_absolute():
+        db_path = Path(root) / db_path
+    backend = SQLiteBackend(db_path)
+    if not backend.exists() and Path(base_path).exists():
+        backend.import_xlsx(base_path, *settings)
+    return backend
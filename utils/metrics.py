@@ -2,16 +2,23 @@
 
 from __future__ import annotations
 
+import weakref
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from zoneinfo import ZoneInfo
 
 import numpy as np
 import pandas as pd
 
+from . import feriados
+from .cache import BoundedCache, detach
+from .filters import filter_key
+
 TZ = ZoneInfo("America/Santiago")
 
+MetricSource = Union[pd.DataFrame, "CubeView", "MetricSet"]
+
 
 def _to_datetime(value) -> Optional[pd.Timestamp]:
     if value is None or (isinstance(value, float) and np.isnan(value)):
@@ -36,8 +43,9 @@ def days_between(
         start, end = end, start
 
     if regla == "habiles":
-        business = pd.bdate_range(start.normalize(), end.normalize(), tz=TZ)
-        return float(len(business))
+        start_day = start.tz_localize(None).normalize()
+        end_day = end.tz_localize(None).normalize()
+        return float(feriados.default_calendar().count(start_day, end_day))
     if regla == "proporcionales" and horas is not None:
         return round(float(horas) / 8.0, 2)
 
@@ -46,32 +54,92 @@ def days_between(
     return float(delta.days + 1)
 
 
+def days_between_columns(
+    inicio: pd.Series,
+    termino: pd.Series,
+    reglas,
+    horas: Optional[pd.Series] = None,
+    calendario: Optional[feriados.BusinessCalendar] = None,
+) -> pd.Series:
+    """Vectorized :func:`days_between` over whole columns.
+
+    ``reglas`` carries the rule of each row; results match the scalar helper.
+    ``habiles`` skips weekends and the holidays of ``calendario``.
+    """
+    index = inicio.index
+    start = pd.to_datetime(inicio, dayfirst=True, errors="coerce", utc=True)
+    end = pd.to_datetime(termino, dayfirst=True, errors="coerce", utc=True)
+    reglas = np.asarray(reglas, dtype=object)
+    valid = (start.notna() & end.notna()).to_numpy()
+    swap = pd.Series(valid & (end < start).to_numpy(), index=index)
+    start, end = start.mask(swap, end), end.mask(swap, start)
+
+    result = np.full(len(index), np.nan)
+    delta = (end - start).to_numpy()
+    result[valid] = delta[valid] // np.timedelta64(1, "D") + 1
+
+    habiles = valid & (reglas == "habiles")
+    if habiles.any():
+        local_start = start.dt.tz_convert(TZ).dt.tz_localize(None).to_numpy()
+        local_end = end.dt.tz_convert(TZ).dt.tz_localize(None).to_numpy()
+        calendario = calendario or feriados.default_calendar()
+        result[habiles] = calendario.count(local_start[habiles], local_end[habiles])
+
+    if horas is not None:
+        proporcionales = reglas == "proporcionales"
+        if proporcionales.any():
+            valores = pd.to_numeric(horas, errors="coerce").to_numpy(dtype=float)
+            unicos, codes = np.unique(valores[proporcionales], return_inverse=True)
+            redondeados = np.array([round(float(h) / 8.0, 2) for h in unicos])
+            result[proporcionales] = redondeados[codes]
+    return pd.Series(result, index=index, dtype=float)
+
+
 def _normalize_tipo(tipo: str) -> str:
     return (tipo or "").strip().title()
 
 
-def kpi_totals(df: pd.DataFrame) -> pd.DataFrame:
+def kpi_totals(df: MetricSource) -> pd.DataFrame:
+    if isinstance(df, MetricSet):
+        return df.memo("kpi_totals", kpi_totals)
+    if isinstance(df, CubeView):
+        grouped = (
+            df.cells.groupby("tipo_registro", observed=True)
+            .agg(registros=("registros", "sum"), dias=("dias", "sum"))
+            .reset_index()
+        )
+        return grouped.sort_values("registros", ascending=False)
     grouped = (
-        df.groupby("tipo_registro")
+        df.groupby("tipo_registro", observed=True)
         .agg(registros=("tipo_registro", "count"), dias=("dias", "sum"))
         .reset_index()
     )
     return grouped.sort_values("registros", ascending=False)
 
 
-def dias_por_sede(df: pd.DataFrame) -> pd.DataFrame:
+def dias_por_sede(df: MetricSource) -> pd.DataFrame:
+    if isinstance(df, MetricSet):
+        return df.memo("dias_por_sede", dias_por_sede)
+    if isinstance(df, CubeView):
+        return (
+            df.cells.groupby("sede", observed=True)
+            .agg(dias=("dias", "sum"), registros=("registros", "sum"))
+            .reset_index()
+        )
     return (
-        df.groupby("sede")
+        df.groupby("sede", observed=True)
         .agg(dias=("dias", "sum"), registros=("sede", "count"))
         .reset_index()
     )
 
 
-def top_personas(df: pd.DataFrame, metric: str = "dias", n: int = 5) -> pd.DataFrame:
+def top_personas(df: MetricSource, metric: str = "dias", n: int = 5) -> pd.DataFrame:
+    if isinstance(df, MetricSet):
+        return df.memo("top_personas", top_personas, metric, n, rows=True)
     metric = metric if metric in ("dias", "registros") else "dias"
     agg_col = "dias" if metric == "dias" else "tipo_registro"
     series = (
-        df.groupby(["rut", "nombre"])
+        df.groupby(["rut", "nombre"], observed=True)
         .agg(
             dias=("dias", "sum"),
             registros=("tipo_registro", "count"),
@@ -83,22 +151,77 @@ def top_personas(df: pd.DataFrame, metric: str = "dias", n: int = 5) -> pd.DataF
     return series
 
 
-def monthly_trend(df: pd.DataFrame) -> pd.DataFrame:
+def monthly_trend(df: MetricSource) -> pd.DataFrame:
+    if isinstance(df, MetricSet):
+        return df.memo("monthly_trend", monthly_trend)
     if df.empty:
         return pd.DataFrame(columns=["mes", "registros", "dias"])
-    tmp = df.copy()
-    tmp["mes"] = pd.to_datetime(tmp["fecha_inicio"]).dt.to_period("M").dt.to_timestamp()
-    grouped = (
-        tmp.groupby("mes")
-        .agg(registros=("tipo_registro", "count"), dias=("dias", "sum"))
-        .reset_index()
-        .sort_values("mes")
-    )
+    if isinstance(df, CubeView):
+        grouped = (
+            df.cells.groupby("mes")
+            .agg(registros=("tipos", "sum"), dias=("dias", "sum"))
+            .reset_index()
+            .sort_values("mes")
+        )
+    else:
+        mes = pd.to_datetime(df["fecha_inicio"]).dt.to_period("M").dt.to_timestamp().rename("mes")
+        grouped = (
+            df.groupby(mes)
+            .agg(registros=("tipo_registro", "count"), dias=("dias", "sum"))
+            .reset_index()
+            .sort_values("mes")
+        )
     grouped["mes_label"] = grouped["mes"].dt.strftime("%Y-%m")
     return grouped
 
 
-def ausentismo_relativo(df: pd.DataFrame) -> float:
+def registros_por_sede_tipo(df: MetricSource) -> pd.DataFrame:
+    if isinstance(df, MetricSet):
+        return df.memo("registros_por_sede_tipo", registros_por_sede_tipo)
+    if isinstance(df, CubeView):
+        return (
+            df.cells.groupby(["sede", "tipo_registro"], observed=True)["registros"]
+            .sum()
+            .reset_index()
+        )
+    return (
+        df.groupby(["sede", "tipo_registro"], observed=True)
+        .size()
+        .reset_index(name="registros")
+    )
+
+
+def registros_por_tipo(df: MetricSource) -> pd.DataFrame:
+    if isinstance(df, MetricSet):
+        return df.memo("registros_por_tipo", registros_por_tipo)
+    if isinstance(df, CubeView):
+        return df.cells.groupby("tipo_registro", observed=True)["registros"].sum().reset_index()
+    return (
+        df.groupby("tipo_registro", observed=True)
+        .size()
+        .reset_index(name="registros")
+    )
+
+
+def kpi_summary(df: MetricSource) -> Dict[str, float]:
+    """Headline counts of a filtered frame or cube slice."""
+    if isinstance(df, MetricSet):
+        return df.memo("kpi_summary", kpi_summary)
+    if isinstance(df, CubeView):
+        return df.summary()
+    registros = len(df)
+    return {
+        "registros": registros,
+        "dias": float(df["dias"].sum()),
+        "personas": int(df["rut"].nunique()),
+        "sedes": int(df["sede"].nunique()),
+        "dias_promedio": float(df["dias"].mean()) if registros else 0.0,
+    }
+
+
+def ausentismo_relativo(df: MetricSource) -> float:
+    if isinstance(df, MetricSet):
+        return df.memo("ausentismo_relativo", ausentismo_relativo, rows=True)
     if df.empty:
         return 0.0
     personas = df["rut"].nunique()
@@ -108,8 +231,10 @@ def ausentismo_relativo(df: pd.DataFrame) -> float:
     return round(float(dias) / personas, 2)
 
 
-def tasa_mensual(df: pd.DataFrame, headcount: Optional[int] = None) -> pd.DataFrame:
-    trend = monthly_trend(df)
+def tasa_mensual(df: MetricSource, headcount: Optional[int] = None) -> pd.DataFrame:
+    if isinstance(df, MetricSet):
+        return df.memo("tasa_mensual", tasa_mensual, headcount, rows=True)
+    trend = monthly_trend(df).copy()
     if trend.empty:
         trend["tasa"] = []
         return trend
@@ -119,30 +244,49 @@ def tasa_mensual(df: pd.DataFrame, headcount: Optional[int] = None) -> pd.DataFr
     return trend
 
 
+TURNO_COLUMNS = ["duracion_horas", "mes", "es_nocturno", "es_fin_semana"]
+TURNO_SOURCES = {"turno_inicio", "turno_fin", "horas", "fecha_inicio"}
+HORAS_NOCTURNAS = [20, 21, 22, 23]
+
+
+def turno_columns(df: pd.DataFrame) -> Dict[str, pd.Series]:
+    """Shift fields derived once at ingest (computed for every row)."""
+    inicio = pd.to_datetime(df["turno_inicio"], errors="coerce")
+    fin = pd.to_datetime(df["turno_fin"], errors="coerce")
+    duracion = (fin - inicio).dt.total_seconds() / 3600.0
+    duracion = duracion.fillna(pd.to_numeric(df["horas"], errors="coerce")).fillna(0)
+    mes = pd.to_datetime(inicio.fillna(pd.to_datetime(df["fecha_inicio"], errors="coerce")))
+    return {
+        "duracion_horas": duracion,
+        "mes": mes.dt.to_period("M").dt.to_timestamp(),
+        "es_nocturno": inicio.dt.hour.isin(HORAS_NOCTURNAS).fillna(False).astype(bool),
+        "es_fin_semana": inicio.dt.weekday.isin([5, 6]).fillna(False).astype(bool),
+    }
+
+
 def turnos_dataset(df: pd.DataFrame) -> pd.DataFrame:
-    turnos = df[df["tipo_registro"].str.lower() == "turno"].copy()
-    if turnos.empty:
+    """Shift rows with the turno columns, deriving them if the frame lacks them."""
+    turnos = df[df["tipo_registro"].str.lower() == "turno"]
+    if turnos.empty or all(col in turnos.columns for col in TURNO_COLUMNS):
         return turnos
-    for col in ["turno_inicio", "turno_fin"]:
-        turnos[col] = pd.to_datetime(turnos[col], errors="coerce")
-    turnos["duracion_horas"] = (
-        (turnos["turno_fin"] - turnos["turno_inicio"]).dt.total_seconds() / 3600.0
-    )
-    turnos["duracion_horas"] = turnos["duracion_horas"].fillna(
-        turnos["horas"]
-    ).fillna(0)
-    turnos["mes"] = pd.to_datetime(turnos["turno_inicio"].fillna(turnos["fecha_inicio"]))
-    turnos["mes"] = turnos["mes"].dt.to_period("M").dt.to_timestamp()
-    turnos["es_nocturno"] = turnos["turno_inicio"].dt.hour.isin([20, 21, 22, 23]).fillna(
-        False
-    )
-    turnos["es_fin_semana"] = (
-        turnos["turno_inicio"].dt.weekday.isin([5, 6]).fillna(False)
+    return turnos.assign(
+        turno_inicio=pd.to_datetime(turnos["turno_inicio"], errors="coerce"),
+        turno_fin=pd.to_datetime(turnos["turno_fin"], errors="coerce"),
+        **turno_columns(turnos),
     )
-    return turnos
 
 
-def resumen_turnos(turnos: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+TURNO_KEYS = ["rut", "nombre", "sede", "turno_codigo", "mes"]
+
+
+def resumen_turnos(turnos: MetricSource) -> Dict[str, pd.DataFrame]:
+    """Per-person, per-code, per-month, heatmap and night-shift summaries.
+
+    The shift rows are grouped once by every key the summaries use; each
+    table is then a small re-aggregation of that grouped frame.
+    """
+    if isinstance(turnos, MetricSet):
+        return turnos.memo("resumen_turnos", resumen_turnos, rows=True)
     if turnos.empty:
         empty = pd.DataFrame(columns=["nombre", "turnos", "horas"])
         return {
@@ -153,8 +297,8 @@ def resumen_turnos(turnos: pd.DataFrame) -> Dict[str, pd.DataFrame]:
             "nocturnos": empty,
         }
 
-    resumen = (
-        turnos.groupby(["rut", "nombre"])
+    base = (
+        turnos.groupby(TURNO_KEYS, observed=True, dropna=False, sort=False)
         .agg(
             turnos=("tipo_registro", "count"),
             horas=("duracion_horas", "sum"),
@@ -164,36 +308,37 @@ def resumen_turnos(turnos: pd.DataFrame) -> Dict[str, pd.DataFrame]:
         .reset_index()
     )
 
+    resumen = (
+        base.groupby(["rut", "nombre"], observed=True)[["turnos", "horas", "nocturnos", "fines_semana"]]
+        .sum()
+        .reset_index()
+    )
+
     por_tipo = (
-        turnos.groupby(["sede", "turno_codigo"])
-        .size()
-        .reset_index(name="turnos")
+        base.groupby(["sede", "turno_codigo"], observed=True)["turnos"]
+        .sum()
+        .reset_index()
         .sort_values("turnos", ascending=False)
     )
 
+    # Rows without a name or month would become NaN/NaT rows and columns of the pivots.
+    fechados = base.dropna(subset=["mes"])
     por_mes = (
-        turnos.groupby(["mes", "sede"])
-        .size()
-        .reset_index(name="turnos")
-        .sort_values("mes")
+        fechados.groupby(["mes", "sede"], observed=True)["turnos"].sum().reset_index().sort_values("mes")
     )
 
-    heatmap = (
-        turnos.pivot_table(
-            index="nombre",
-            columns=turnos["mes"].dt.strftime("%Y-%m"),
-            values="tipo_registro",
-            aggfunc="count",
-            fill_value=0,
-        )
-        .reset_index()
+    por_persona_mes = (
+        fechados.dropna(subset=["nombre"]).groupby(["nombre", "mes"], observed=True)["turnos"].sum()
     )
+    heatmap = por_persona_mes.unstack("mes", fill_value=0)
+    heatmap.columns = heatmap.columns.strftime("%Y-%m")
+    heatmap = heatmap.reset_index()
 
+    nocturnos = base.groupby(["nombre"], observed=True)["nocturnos"].sum()
     nocturnos = (
-        turnos[turnos["es_nocturno"]]
-        .groupby(["nombre"])
-        .size()
-        .reset_index(name="nocturnos")
+        nocturnos[nocturnos > 0]
+        .astype("int64")
+        .reset_index()
         .sort_values("nocturnos", ascending=False)
     )
 
@@ -204,3 +349,396 @@ def resumen_turnos(turnos: pd.DataFrame) -> Dict[str, pd.DataFrame]:
         "heatmap": heatmap,
         "nocturnos": nocturnos,
     }
+
+
+NO_AUSENCIA = {"turno"}
+SIN_SEDE = "Sin sede"
+
+
+def intervalos_ausencia(df: pd.DataFrame) -> pd.DataFrame:
+    """Absence intervals as whole days; shifts and undated rows are dropped."""
+    tipo = df["tipo_registro"].astype("string").str.strip().str.lower()
+    inicio = pd.to_datetime(df["fecha_inicio"], errors="coerce").dt.normalize()
+    termino = pd.to_datetime(df["fecha_termino"], errors="coerce").dt.normalize()
+    inicio, termino = inicio.fillna(termino), termino.fillna(inicio)
+    invertido = termino < inicio
+    frame = pd.DataFrame(
+        {
+            "rut": df["rut"],
+            "sede": df["sede"].astype("string").fillna(SIN_SEDE),
+            "tipo": df["tipo_registro"],
+            "inicio": inicio.mask(invertido, termino),
+            "termino": termino.mask(invertido, inicio),
+        }
+    )
+    keep = tipo.notna() & ~tipo.isin(NO_AUSENCIA) & frame["inicio"].notna()
+    return frame[keep.to_numpy()]
+
+
+def _merge_intervals(frame: pd.DataFrame, keys: List[str], unit: str = "D") -> pd.DataFrame:
+    """Collapse overlapping or touching intervals that share ``keys``.
+
+    ``inicio`` and ``termino`` are inclusive bins of ``unit`` (days or hours).
+    """
+    if frame.empty:
+        return frame
+    frame = frame.sort_values([*keys, "inicio"], kind="mergesort")
+    same = np.ones(len(frame), dtype=bool)
+    for key in keys:
+        values = frame[key].to_numpy()
+        same[1:] &= values[1:] == values[:-1]
+    same[0] = False
+    fin = frame["termino"].to_numpy(dtype=f"datetime64[{unit}]").astype(np.int64)
+    group = np.cumsum(~same)
+    fin_previo = pd.Series(fin).groupby(group).cummax().shift(1).to_numpy()
+    inicio = frame["inicio"].to_numpy(dtype=f"datetime64[{unit}]").astype(np.int64)
+    nuevo = ~same | ~(inicio <= fin_previo + 1)
+    bloque = np.cumsum(nuevo)
+    merged = frame.assign(_bloque=bloque).groupby("_bloque", sort=False).agg(
+        {**{key: "first" for key in keys}, "inicio": "min", "termino": "max"}
+    )
+    return merged.reset_index(drop=True)
+
+
+def _sweep(intervalos: pd.DataFrame, unit: str, desde, hasta, name: str) -> pd.DataFrame:
+    """Count intervals per ``unit`` bin (rows) and sede (columns) with a difference array."""
+    if intervalos.empty:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name=name))
+    inicio = intervalos["inicio"].to_numpy(dtype=f"datetime64[{unit}]")
+    termino = intervalos["termino"].to_numpy(dtype=f"datetime64[{unit}]")
+    primero = np.datetime64(pd.Timestamp(desde).floor(unit), unit) if desde is not None else inicio.min()
+    ultimo = np.datetime64(pd.Timestamp(hasta).floor(unit), unit) if hasta is not None else termino.max()
+    dentro = (termino >= primero) & (inicio <= ultimo)
+    pasos = int((ultimo - primero).astype(np.int64)) + 1
+    sede_codes, sedes = pd.factorize(intervalos["sede"].to_numpy()[dentro], sort=True)
+    if pasos <= 0 or not len(sedes):
+        return pd.DataFrame(index=pd.DatetimeIndex([], name=name))
+    desde_idx = (np.maximum(inicio[dentro], primero) - primero).astype(np.int64)
+    hasta_idx = (np.minimum(termino[dentro], ultimo) - primero).astype(np.int64) + 1
+    diff = np.zeros((pasos + 1, len(sedes)), dtype=np.int32)
+    np.add.at(diff, (desde_idx, sede_codes), 1)
+    np.add.at(diff, (hasta_idx, sede_codes), -1)
+    index = pd.date_range(pd.Timestamp(primero), periods=pasos, freq=unit, name=name)
+    return pd.DataFrame(np.cumsum(diff[:-1], axis=0), index=index, columns=list(sedes))
+
+
+def ocupacion_diaria(
+    df: MetricSource,
+    desde=None,
+    hasta=None,
+) -> pd.DataFrame:
+    """People absent per day (rows) and sede (columns).
+
+    Each person's overlapping absences are merged first, then a difference
+    array (+1 on the first day, -1 after the last) is accumulated over a
+    dense day index, so the cost is O(events + days).
+    """
+    if isinstance(df, MetricSet):
+        return df.memo("ocupacion_diaria", ocupacion_diaria, desde, hasta, rows=True)
+    intervalos = _merge_intervals(intervalos_ausencia(df), ["sede", "rut"])
+    return _sweep(intervalos, "D", desde, hasta, "fecha")
+
+
+def intervalos_turno(turnos: pd.DataFrame) -> pd.DataFrame:
+    """Shifts as inclusive hour bins; a shift touching an hour counts for it.
+
+    Without ``turno_fin`` the duration comes from ``horas``; an end before
+    the start is read as a shift that crosses midnight.
+    """
+    tipo = turnos["tipo_registro"].astype("string").str.strip().str.lower()
+    inicio = pd.to_datetime(turnos["turno_inicio"], errors="coerce")
+    fin = pd.to_datetime(turnos["turno_fin"], errors="coerce")
+    horas = pd.to_numeric(turnos["horas"], errors="coerce") if "horas" in turnos.columns else np.nan
+    fin = fin.fillna(inicio + pd.to_timedelta(horas, unit="h"))
+    fin = fin.mask(fin < inicio, fin + pd.Timedelta(days=1))
+    primera = inicio.dt.floor("h")
+    ultima = (fin.dt.ceil("h") - pd.Timedelta(hours=1)).clip(lower=primera)
+    frame = pd.DataFrame(
+        {
+            "rut": turnos["rut"],
+            "sede": turnos["sede"].astype("string").fillna(SIN_SEDE),
+            "inicio": primera,
+            "termino": ultima,
+        }
+    )
+    keep = (tipo == "turno").fillna(False) & frame["inicio"].notna() & frame["termino"].notna()
+    return frame[keep.to_numpy()]
+
+
+def cobertura_turnos(turnos: MetricSource, desde=None, hasta=None) -> pd.DataFrame:
+    """Distinct staff on shift per hour (rows) and sede (columns).
+
+    Same sweep as :func:`ocupacion_diaria` at hour resolution: a year of
+    shifts is a dense 8,760-row matrix built in O(shifts + hours).
+    """
+    if isinstance(turnos, MetricSet):
+        return turnos.memo("cobertura_turnos", cobertura_turnos, desde, hasta, rows=True)
+    intervalos = _merge_intervals(intervalos_turno(turnos), ["sede", "rut"], unit="h")
+    return _sweep(intervalos, "h", desde, hasta, "hora")
+
+
+COBERTURA_DEFAULTS = {"minimo": 2, "hora_inicio": 0, "hora_fin": 24}
+
+
+def cobertura_critica(cobertura: pd.DataFrame, umbral: Optional[Dict] = None) -> Dict[str, pd.DataFrame]:
+    """Hours below the minimum staff of ``umbrales.turnos_criticos``.
+
+    Only hours between ``hora_inicio`` and ``hora_fin`` of days on which
+    the sede has at least one shift are evaluated; ``minimo_sede`` can
+    override ``minimo`` per sede. ``resumen`` carries the share of
+    critical hours that the verde/amarillo thresholds grade.
+    """
+    umbral = {**COBERTURA_DEFAULTS, **(umbral or {})}
+    columnas = ["hora", "sede", "personal", "minimo", "faltan"]
+    if cobertura.empty:
+        return {
+            "detalle": pd.DataFrame(columns=columnas),
+            "resumen": pd.DataFrame(columns=["sede", "horas", "criticas", "pct_criticas", "personal_min"]),
+        }
+    hora = cobertura.index.hour
+    en_horario = (hora >= int(umbral["hora_inicio"])) & (hora < int(umbral["hora_fin"]))
+    abierto = cobertura.groupby(cobertura.index.normalize()).transform("max").to_numpy() > 0
+    evaluada = abierto & en_horario[:, None]
+    por_sede = umbral.get("minimo_sede") or {}
+    minimos = np.array([float(por_sede.get(sede, umbral["minimo"])) for sede in cobertura.columns])
+    valores = cobertura.to_numpy()
+    critica = evaluada & (valores < minimos)
+
+    filas, cols = np.nonzero(critica)
+    detalle = pd.DataFrame(
+        {
+            "hora": cobertura.index[filas],
+            "sede": cobertura.columns[cols],
+            "personal": valores[filas, cols],
+            "minimo": minimos[cols],
+        }
+    )
+    detalle["faltan"] = detalle["minimo"] - detalle["personal"]
+    horas = evaluada.sum(axis=0)
+    criticas = critica.sum(axis=0)
+    resumen = pd.DataFrame(
+        {
+            "sede": cobertura.columns,
+            "horas": horas,
+            "criticas": criticas,
+            "pct_criticas": np.round(np.divide(criticas * 100.0, horas, out=np.zeros(len(horas)), where=horas > 0), 1),
+            "personal_min": np.where(horas > 0, np.where(evaluada, valores, valores.max()).min(axis=0), 0),
+        }
+    )
+    return {"detalle": detalle[columnas], "resumen": resumen}
+
+
+CUBE_DIMENSIONS = ["mes", "sede", "tipo_registro", "subtipo", "estado"]
+CUBE_FILTERS = {"sede": "sede", "tipo": "tipo_registro", "subtipo": "subtipo", "estado": "estado"}
+
+
+@dataclass
+class CubeView:
+    """Cells of an :class:`EventCube` selected by a filter state."""
+
+    cells: pd.DataFrame
+    ruts: np.ndarray
+
+    @property
+    def empty(self) -> bool:
+        return self.cells.empty
+
+    def summary(self) -> Dict[str, float]:
+        registros = int(self.cells["registros"].sum())
+        dias = float(self.cells["dias"].sum())
+        personas = 0
+        if len(self.ruts):
+            personas = int(np.unpackbits(np.bitwise_or.reduce(self.ruts, axis=0)).sum())
+        return {
+            "registros": registros,
+            "dias": dias,
+            "personas": personas,
+            "sedes": int(self.cells["sede"].nunique()),
+            "dias_promedio": dias / registros if registros else 0.0,
+        }
+
+
+NAT_KEY = np.iinfo(np.int64).max
+VIEW_MEMO = 32
+
+
+def _cube_cells(df: pd.DataFrame, rut_labels: pd.Index) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Cells of ``df`` grouped by :data:`CUBE_DIMENSIONS` and their rut bitmaps."""
+    fecha = pd.to_datetime(df["fecha_inicio"], errors="coerce")
+    keys = pd.DataFrame(
+        {
+            "mes": fecha.dt.to_period("M").dt.to_timestamp(),
+            **{col: df[col] for col in CUBE_DIMENSIONS[1:]},
+            "registros": np.ones(len(df), dtype=np.int64),
+            "tipos": df["tipo_registro"].notna().to_numpy(dtype=np.int64),
+            "dias": pd.to_numeric(df["dias"], errors="coerce").astype("float64"),
+            "horas": pd.to_numeric(df["horas"], errors="coerce").astype("float64"),
+        }
+    )
+    grouped = keys.groupby(CUBE_DIMENSIONS, dropna=False, observed=True, sort=False)
+    cells = grouped[["registros", "tipos", "dias", "horas"]].sum().reset_index()
+    cell_ids = grouped.ngroup().to_numpy()
+
+    rut_codes = rut_labels.get_indexer(df["rut"])
+    known = rut_codes >= 0
+    pairs = np.unique(cell_ids[known].astype(np.int64) * len(rut_labels) + rut_codes[known])
+    cell, code = np.divmod(pairs, max(len(rut_labels), 1))
+    ruts = np.zeros((len(cells), (len(rut_labels) + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(ruts, (cell, code >> 3), (128 >> (code & 7)).astype(np.uint8))
+    return cells, ruts
+
+
+def _wanted_numbers(values) -> np.ndarray:
+    return pd.to_numeric(pd.Series(list(values)), errors="coerce").dropna().to_numpy()
+
+
+def _month_start(ts: pd.Timestamp) -> pd.Timestamp:
+    return ts.to_period("M").start_time.as_unit("ns")
+
+
+class EventCube:
+    """Events aggregated per (mes, sede, tipo_registro, subtipo, estado).
+
+    Every non-empty cell keeps ``registros``, ``dias`` and ``horas`` plus a
+    packed bitmap of the ruts it contains, so distinct people can be counted
+    for any slice without touching the raw rows. Date ranges are answered
+    from whole-month cells; only the rows of partially covered edge months
+    are aggregated from the source frame.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self._source = weakref.ref(df)
+        fecha = pd.to_datetime(df["fecha_inicio"], errors="coerce")
+        dated = fecha.dropna()
+        self.whole_days = bool((dated == dated.dt.normalize()).all())
+        self.rut_labels = pd.Index(pd.factorize(df["rut"])[1])
+        self.cells, self.ruts = _cube_cells(df, self.rut_labels)
+        values = fecha.to_numpy(dtype="datetime64[ns]")
+        keys = np.where(np.isnat(values), NAT_KEY, values.view(np.int64))
+        self._order = np.argsort(keys, kind="stable")
+        self._claves = keys[self._order]
+        self._views: Dict[Tuple, CubeView] = {}
+
+    def built_from(self, df: Optional[pd.DataFrame]) -> bool:
+        return df is not None and self._source() is df
+
+    def _facet_mask(self, frame: pd.DataFrame, filtros: Dict) -> np.ndarray:
+        mask = np.ones(len(frame), dtype=bool)
+        for key, column in CUBE_FILTERS.items():
+            if filtros.get(key):
+                mask &= frame[column].isin(filtros[key]).to_numpy()
+        for key, part in (("anios", "year"), ("meses", "month")):
+            if filtros.get(key):
+                mask &= getattr(frame["mes"].dt, part).isin(_wanted_numbers(filtros[key])).to_numpy()
+        return mask
+
+    def _edges(self, positions: np.ndarray, filtros: Dict) -> Tuple[pd.DataFrame, np.ndarray]:
+        cells, ruts = _cube_cells(self._source().iloc[np.sort(positions)], self.rut_labels)
+        mask = self._facet_mask(cells, filtros)
+        return cells[mask], ruts[mask]
+
+    def select(self, filtros: Dict) -> Optional[CubeView]:
+        """Cells matching ``filtros``, or ``None`` when they need the raw rows.
+
+        Only person filters (and a source frame that is gone) fall back to
+        the raw rows; views are memoized per filter state.
+        """
+        if filtros.get("personas") or self._source() is None:
+            return None
+        key = filter_key(filtros)
+        if key not in self._views:
+            if len(self._views) >= VIEW_MEMO:
+                self._views.pop(next(iter(self._views)))
+            self._views[key] = self._select(filtros)
+        return self._views[key]
+
+    def _select(self, filtros: Dict) -> CubeView:
+        cells = self.cells
+        mask = self._facet_mask(cells, filtros)
+        start, end = filtros.get("fecha_rango") or (None, None)
+        if not (start or end):
+            return CubeView(cells[mask], self.ruts[mask])
+
+        # Rows are kept when start <= fecha_inicio <= end, as in apply_filters.
+        lo = pd.Timestamp(start).as_unit("ns") if start else None
+        hi = pd.Timestamp(end).as_unit("ns") if end else None
+        lo_i = int(np.searchsorted(self._claves, lo.value, "left")) if lo is not None else 0
+        hi_i = int(
+            np.searchsorted(self._claves, hi.value, "right")
+            if hi is not None
+            else np.searchsorted(self._claves, NAT_KEY, "left")
+        )
+        # Months lying entirely inside the range come from the cells.
+        whole = cells["mes"].notna().to_numpy(copy=True)
+        wl, wh = lo_i, hi_i
+        if lo is not None:
+            first = _month_start(lo)
+            if first < lo:
+                first = _month_start(first + pd.offsets.MonthBegin(1))
+            whole &= (cells["mes"] >= first).to_numpy()
+            wl = max(wl, int(np.searchsorted(self._claves, first.value, "left")))
+        if hi is not None:
+            limit = hi.normalize() + pd.Timedelta(days=1) if self.whole_days else hi + pd.Timedelta(1, "ns")
+            last = _month_start(limit)
+            whole &= (cells["mes"] < last).to_numpy()
+            wh = min(wh, int(np.searchsorted(self._claves, last.value, "left")))
+        if wl < wh:
+            edges = np.concatenate([self._order[lo_i:wl], self._order[wh:hi_i]])
+        else:
+            whole[:] = False
+            edges = self._order[lo_i:hi_i]
+        mask &= whole
+        if not len(edges):
+            return CubeView(cells[mask], self.ruts[mask])
+        edge_cells, edge_ruts = self._edges(edges, filtros)
+        return CubeView(
+            pd.concat([cells[mask], edge_cells], ignore_index=True),
+            np.concatenate([self.ruts[mask], edge_ruts]),
+        )
+
+
+METRIC_CACHE = BoundedCache(64 * 1024 * 1024, max_entries=512)
+
+
+def _detached(value):
+    if isinstance(value, pd.DataFrame):
+        return detach(value)
+    if isinstance(value, dict):
+        return {key: _detached(item) for key, item in value.items()}
+    return value
+
+
+@dataclass
+class MetricSet:
+    """Memoized metrics of one filtered slice of a dataset version.
+
+    Results are shared process-wide in :data:`METRIC_CACHE` under
+    ``(version, scope, filter_key(filtros), metric, args)``. Aggregates use
+    ``view`` (a cube slice) when present; person-level metrics use ``rows``.
+    """
+
+    rows: pd.DataFrame
+    version: str
+    filtros: Dict
+    scope: str = ""
+    view: Optional[CubeView] = None
+
+    @property
+    def empty(self) -> bool:
+        return self.rows.empty
+
+    def over_rows(self, scope: str) -> "MetricSet":
+        return MetricSet(self.rows, self.version, self.filtros, scope)
+
+    def turnos(self) -> "MetricSet":
+        """The shift rows of this set, memoized under their own scope."""
+        return MetricSet(turnos_dataset(self.rows), self.version, self.filtros, f"{self.scope}:turnos")
+
+    def memo(self, name: str, func: Callable, *args, rows: bool = False):
+        source = self.rows if rows or self.view is None else self.view
+        key = (self.version, self.scope, filter_key(self.filtros), name, args)
+        return _detached(METRIC_CACHE.get_or_compute(key, lambda: func(source, *args)))
+
+
+def metric_cache_stats() -> Dict[str, float]:
+    return METRIC_CACHE.stats()
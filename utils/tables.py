@@ -19,7 +19,7 @@ def subtotales_por(df: pd.DataFrame, group_cols: Iterable[str]) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame(columns=[*group_cols, "registros", "dias"])
     grouped = (
-        df.groupby(list(group_cols))
+        df.groupby(list(group_cols), observed=True)
         .agg(registros=("tipo_registro", "count"), dias=("dias", "sum"))
         .reset_index()
     )